@@ -0,0 +1,70 @@
+"""add resumen_diario
+
+Revision ID: 3c9e1f27b8a4
+Revises: 5ea38226e57b
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e1f27b8a4'
+down_revision: Union[str, Sequence[str], None] = '5ea38226e57b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # la app también la crea con create_all() al arrancar
+    op.create_table('resumen_diario',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('dia', sa.Date(), nullable=False),
+    sa.Column('mesa_id', sa.Integer(), nullable=False),
+    sa.Column('atendido_por_id', sa.Integer(), nullable=False),
+    sa.Column('cobrado_por_id', sa.Integer(), nullable=False),
+    sa.Column('cantidad_turnos', sa.Integer(), nullable=False),
+    sa.Column('total_tiempo', sa.Float(), nullable=False),
+    sa.Column('total_productos', sa.Float(), nullable=False),
+    sa.Column('total_descuentos', sa.Float(), nullable=False),
+    sa.Column('total_servicios_extras', sa.Float(), nullable=False),
+    sa.Column('total_general', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('dia', 'mesa_id', 'atendido_por_id', 'cobrado_por_id', name='uq_resumen_diario_clave'),
+    if_not_exists=True,
+    )
+    op.create_index(op.f('ix_resumen_diario_id'), 'resumen_diario', ['id'], unique=False, if_not_exists=True)
+
+    # backfill del histórico (mismo cálculo que app.utils.resumen_diario.reconstruir_resumen_diario)
+    op.execute("""
+        DELETE FROM resumen_diario;
+        INSERT INTO resumen_diario (
+            dia, mesa_id, atendido_por_id, cobrado_por_id,
+            cantidad_turnos, total_tiempo, total_productos,
+            total_descuentos, total_servicios_extras, total_general
+        )
+        SELECT
+            CAST(hora_fin AS DATE),
+            COALESCE(mesa_id, 0),
+            COALESCE(atendido_por_id, 0),
+            COALESCE(cobrado_por_id, 0),
+            COUNT(id),
+            COALESCE(SUM(subtotal_tiempo), 0),
+            COALESCE(SUM(subtotal_productos), 0),
+            COALESCE(SUM(descuento), 0),
+            COALESCE(SUM(servicios_extras), 0),
+            COALESCE(SUM(total_final), 0)
+        FROM turnos
+        WHERE estado = 'cerrado' AND hora_fin IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_resumen_diario_id'), table_name='resumen_diario')
+    op.drop_table('resumen_diario')
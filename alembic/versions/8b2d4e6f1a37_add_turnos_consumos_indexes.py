@@ -0,0 +1,46 @@
+"""add turnos and consumos indexes
+
+Revision ID: 8b2d4e6f1a37
+Revises: 3c9e1f27b8a4
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2d4e6f1a37'
+down_revision: Union[str, Sequence[str], None] = '3c9e1f27b8a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_turnos_activos_mesa', 'turnos', ['mesa_id'], unique=False,
+        postgresql_where=sa.text("estado IN ('abierto', 'pausado')"),
+        if_not_exists=True,
+    )
+    op.create_index(
+        'ix_turnos_cerrados_hora_fin', 'turnos', ['hora_fin'], unique=False,
+        postgresql_where=sa.text("estado = 'cerrado'"),
+        if_not_exists=True,
+    )
+    op.create_index(
+        'ix_turnos_cerrados_atendido_hora_fin', 'turnos', ['atendido_por_id', 'hora_fin'], unique=False,
+        postgresql_where=sa.text("estado = 'cerrado'"),
+        if_not_exists=True,
+    )
+    op.create_index(op.f('ix_consumos_turno_id'), 'consumos', ['turno_id'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_consumos_turno_id'), table_name='consumos')
+    op.drop_index('ix_turnos_cerrados_atendido_hora_fin', table_name='turnos')
+    op.drop_index('ix_turnos_cerrados_hora_fin', table_name='turnos')
+    op.drop_index('ix_turnos_activos_mesa', table_name='turnos')
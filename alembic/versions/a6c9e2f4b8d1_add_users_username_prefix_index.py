@@ -0,0 +1,31 @@
+"""add users username prefix index
+
+Revision ID: a6c9e2f4b8d1
+Revises: f2b8d6a4c1e9
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c9e2f4b8d1'
+down_revision: Union[str, Sequence[str], None] = 'f2b8d6a4c1e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_users_username_prefijo', 'users', ['username'], unique=False,
+        postgresql_ops={'username': 'varchar_pattern_ops'},
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_username_prefijo', table_name='users', if_exists=True)
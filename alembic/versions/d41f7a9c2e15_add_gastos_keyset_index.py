@@ -0,0 +1,30 @@
+"""add gastos keyset index
+
+Revision ID: d41f7a9c2e15
+Revises: 8b2d4e6f1a37
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41f7a9c2e15'
+down_revision: Union[str, Sequence[str], None] = '8b2d4e6f1a37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_gastos_created_at_id', 'gastos', ['created_at', 'id'], unique=False,
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_gastos_created_at_id', table_name='gastos', if_exists=True)
@@ -0,0 +1,30 @@
+"""add version column to turnos and mesas
+
+Revision ID: e7a3c5b9d2f4
+Revises: d41f7a9c2e15
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3c5b9d2f4'
+down_revision: Union[str, Sequence[str], None] = 'd41f7a9c2e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('turnos', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('mesas', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('mesas', 'version')
+    op.drop_column('turnos', 'version')
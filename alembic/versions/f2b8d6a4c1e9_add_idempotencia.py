@@ -0,0 +1,42 @@
+"""add idempotencia table
+
+Revision ID: f2b8d6a4c1e9
+Revises: e7a3c5b9d2f4
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d6a4c1e9'
+down_revision: Union[str, Sequence[str], None] = 'e7a3c5b9d2f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'idempotencia',
+        sa.Column('clave', sa.String(length=255), nullable=False),
+        sa.Column('huella', sa.String(length=64), nullable=False),
+        sa.Column('estado', sa.String(), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=True),
+        sa.Column('headers', sa.JSON(), nullable=True),
+        sa.Column('body', sa.LargeBinary(), nullable=True),
+        sa.Column('creado', sa.DateTime(), nullable=False),
+        sa.Column('expira', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('clave'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_idempotencia_expira', 'idempotencia', ['expira'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_idempotencia_expira', table_name='idempotencia', if_exists=True)
+    op.drop_table('idempotencia', if_exists=True)
@@ -13,6 +13,55 @@ class Settings(BaseSettings):
 
     DATABASE_URL_PROD: str | None = None
 
+    # pool de conexiones
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SEG: int = 30
+    DB_POOL_RECYCLE_SEG: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # statement_timeout (ms): general, escrituras del POS y reportes
+    DB_STATEMENT_TIMEOUT_MS: int = 15000
+    DB_STATEMENT_TIMEOUT_POS_MS: int = 3000
+    DB_STATEMENT_TIMEOUT_REPORTES_MS: int = 120000
+
+    # lecturas calientes (/mesas, /turnos/activos, /productos) con AsyncSession (asyncpg)
+    DB_ASYNC_LECTURAS: bool = True
+    DB_ASYNC_POOL_SIZE: int = 10
+    DB_ASYNC_MAX_OVERFLOW: int = 10
+
+    # cache de usuario autenticado (get_current_user)
+    USER_CACHE_TTL_SEG: int = 60
+    USER_CACHE_MAX: int = 1024
+
+    # cache de tokens JWT ya verificados (decode_token)
+    TOKEN_CACHE_MAX: int = 4096
+
+    # hashing de contraseñas (argon2) y su pool dedicado
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
+    HASH_WORKERS: int = 2
+    HASH_MAX_PENDING: int = 8
+
+    # uploads de imágenes (tamaño máximo y lado en px de las variantes)
+    UPLOAD_MAX_MB: int = 8
+    UPLOAD_THUMB_PX: int = 256
+    UPLOAD_MD_PX: int = 1024
+
+    # listados paginados (gastos, consumos, users): tamaño de página sin ?limit=
+    PAGINA_DEFAULT: int = 100
+
+    # respuestas rápidas: validar igual contra el response_model (desarrollo / tests)
+    VALIDAR_RESPUESTAS: bool = False
+
+    # Idempotency-Key en endpoints del POS: cuánto se guarda la respuesta
+    IDEMPOTENCIA_TTL_HORAS: int = 24
+    IDEMPOTENCIA_LIMPIEZA_MIN: int = 10
+
+    # /metrics (Prometheus): si se define, el scraper manda Authorization: Bearer <token>
+    METRICAS_TOKEN: str | None = None
+
     class Config:
         env_file = ".env"
 
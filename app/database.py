@@ -1,23 +1,162 @@
-from sqlalchemy import create_engine
+import threading
+import time
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
 from app.config import settings
 
-DATABASE_URL = (
+
+def _url_psycopg2(url: str) -> str:
+    # Railway/Heroku entregan postgres:// o postgresql:// sin driver
+    for prefijo in ("postgres://", "postgresql://"):
+        if url.startswith(prefijo):
+            return "postgresql+psycopg2://" + url[len(prefijo):]
+    return url
+
+
+DATABASE_URL = _url_psycopg2(settings.DATABASE_URL_PROD) if settings.DATABASE_URL_PROD else (
     f"postgresql+psycopg2://{settings.POSTGRES_USER}:"
     f"{settings.POSTGRES_PASSWORD}@{settings.POSTGRES_HOST}:"
     f"{settings.POSTGRES_PORT}/{settings.POSTGRES_DB}"
 )
 
-engine = create_engine(DATABASE_URL, echo=False)
+
+class EstadisticasPool:
+    """
+    Cuánto esperan los requests por una conexión del pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total_seg = 0.0
+        self.espera_max_seg = 0.0
+
+    def registrar(self, espera_seg: float, timeout: bool = False):
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.espera_total_seg += espera_seg
+            self.espera_max_seg = max(self.espera_max_seg, espera_seg)
+
+
+pool_stats = EstadisticasPool()
+
+
+class PoolMedido(QueuePool):
+    """
+    QueuePool que mide el tiempo de espera de cada checkout.
+    """
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.registrar(time.perf_counter() - inicio, timeout=True)
+            raise
+        pool_stats.registrar(time.perf_counter() - inicio)
+        return conn
+
+
+engine = create_engine(
+    DATABASE_URL,
+    echo=False,
+    poolclass=PoolMedido,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SEG,
+    pool_recycle=settings.DB_POOL_RECYCLE_SEG,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args={"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"},
+)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# engine async (asyncpg) para las lecturas que las tablets consultan todo el tiempo:
+# no ocupan un thread del threadpool mientras esperan a la base
+ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql+psycopg2://", "postgresql+asyncpg://", 1)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=False,
+    pool_size=settings.DB_ASYNC_POOL_SIZE,
+    max_overflow=settings.DB_ASYNC_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SEG,
+    pool_recycle=settings.DB_POOL_RECYCLE_SEG,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args={"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}},
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
+@event.listens_for(SessionLocal, "after_begin")
+def _aplicar_statement_timeout(session, transaction, connection):
+    # timeout propio de la sesión (ver db_con_timeout); SET LOCAL dura solo esta transacción
+    ms = session.info.get("statement_timeout_ms")
+    if ms is not None:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(ms)}")
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def db_con_timeout(statement_timeout_ms: int):
+    """
+    Igual que get_db pero con otro statement_timeout para las consultas del request.
+    """
+    def _get_db():
+        db = SessionLocal(info={"statement_timeout_ms": statement_timeout_ms})
+        try:
+            yield db
+        finally:
+            db.close()
+
+    return _get_db
+
+
+# escrituras del POS: cortas; reportes: pueden tardar más
+get_db_pos = db_con_timeout(settings.DB_STATEMENT_TIMEOUT_POS_MS)
+get_db_reportes = db_con_timeout(settings.DB_STATEMENT_TIMEOUT_REPORTES_MS)
+
+
+def estado_pool() -> dict:
+    pool = engine.pool
+    pool_async = async_engine.pool
+    checkouts = pool_stats.checkouts
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "checkouts": checkouts,
+        "timeouts": pool_stats.timeouts,
+        "espera_promedio_ms": (pool_stats.espera_total_seg / checkouts * 1000) if checkouts else 0.0,
+        "espera_max_ms": pool_stats.espera_max_seg * 1000,
+        "async": {
+            "pool_size": pool_async.size(),
+            "max_overflow": settings.DB_ASYNC_MAX_OVERFLOW,
+            "checked_out": pool_async.checkedout(),
+            "idle": pool_async.checkedin(),
+            "overflow": max(0, pool_async.overflow()),
+        },
+    }
@@ -1,14 +1,35 @@
+from dataclasses import dataclass
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from app.config import settings
+from app.utils.cache import TTLCache
 from app.utils.security import decode_token
-from app.database import get_db
+from app.database import SessionLocal
 from app.models.user import User
 
 oauth2 = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_current_user(token: str = Depends(oauth2), db: Session = Depends(get_db)):
+@dataclass(frozen=True)
+class UsuarioActual:
+    """
+    Identidad del usuario autenticado (lo que guardamos en cache, no el objeto ORM).
+    """
+    id: int
+    username: str
+    rol: str
+
+
+# sub (id de usuario) -> UsuarioActual
+usuarios_cache = TTLCache(maxsize=settings.USER_CACHE_MAX, ttl=settings.USER_CACHE_TTL_SEG)
+
+
+def invalidar_usuario(user_id: int):
+    usuarios_cache.invalidate(str(user_id))
+
+
+def get_current_user(token: str = Depends(oauth2)):
     payload = decode_token(token)
     if not payload:
         raise HTTPException(
@@ -16,11 +37,19 @@ def get_current_user(token: str = Depends(oauth2), db: Session = Depends(get_db)
             detail="Token inválido o expirado"
         )
 
-    user_id = payload.get("sub")
-    user = db.query(User).filter(User.id == user_id).first()
+    user_id = str(payload.get("sub"))
+
+    user = usuarios_cache.get(user_id)
+    if user is None:
+        # sesión corta: la conexión vuelve al pool enseguida, no al terminar el request
+        with SessionLocal() as db:
+            db_user = db.query(User).filter(User.id == user_id).first()
+
+        if not db_user:
+            raise HTTPException(401, "Usuario no encontrado")
 
-    if not user:
-        raise HTTPException(401, "Usuario no encontrado")
+        user = UsuarioActual(id=db_user.id, username=db_user.username, rol=db_user.rol)
+        usuarios_cache.set(user_id, user)
 
     return user
 
@@ -1,22 +1,27 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routers import auth, mesas, productos, consumos, reportes, users, turnos, arqueo, categorias, gastos
-from app.database import Base, engine
+from app.routers import auth, mesas, productos, consumos, reportes, users, turnos, arqueo, categorias, gastos, admin, floor, metricas
+from app.database import Base, engine, async_engine
+from app.utils.metricas import MetricasMiddleware, instrumentar_engine
+from app.utils.respuestas import RespuestaJSON
+from app.utils.idempotencia import IdempotenciaMiddleware, RespuestaRepetida, respuesta_repetida_handler
 
-from fastapi.staticfiles import StaticFiles
+from app.utils.estaticos import StaticFilesCacheados
 from pathlib import Path
 
 
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Billar API")
+# orjson por defecto; los endpoints calientes devuelven respuesta_json directo
+app = FastAPI(title="Billar API", default_response_class=RespuestaJSON)
 
 # Servir archivos estáticos (imágenes)
 static_dir = Path(__file__).resolve().parent / "static"
 static_dir.mkdir(parents=True, exist_ok=True)
 
-app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+# uploads con nombre por contenido: cache immutable; variantes y .br/.gz si existen
+app.mount("/static", StaticFilesCacheados(directory=str(static_dir)), name="static")
 
 
 ALLOWED_ORIGINS = [
@@ -29,6 +34,11 @@ ALLOWED_ORIGINS = [
    #"https://billartiochichi-production.up.railway.app", #nueva que estamos usando
 ]
 
+# Idempotency-Key: guarda la primera respuesta de los endpoints que usan Depends(idempotente)
+# (se agrega antes que CORS para quedar por dentro: lo guardado no incluye headers de CORS)
+app.add_middleware(IdempotenciaMiddleware)
+app.add_exception_handler(RespuestaRepetida, respuesta_repetida_handler)
+
 #Configuración CORS
 app.add_middleware(
     CORSMiddleware,
@@ -36,7 +46,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Idempotent-Replayed"],
 )
+
+# métricas por ruta (latencia, status, SQL por request) -> GET /metrics
+# el último middleware agregado queda por fuera de todos: mide el request completo
+instrumentar_engine(engine)
+instrumentar_engine(async_engine.sync_engine)
+app.add_middleware(MetricasMiddleware)
+
 #rutas de la API
 app.include_router(auth.router)
 app.include_router(mesas.router)
@@ -48,3 +66,6 @@ app.include_router(turnos.router)
 app.include_router(arqueo.router)
 app.include_router(categorias.router)
 app.include_router(gastos.router)
+app.include_router(admin.router)
+app.include_router(floor.router)
+app.include_router(metricas.router)
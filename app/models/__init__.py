@@ -4,4 +4,6 @@ from .consumo import Consumo
 from .producto import Producto
 from .user import User
 from .arqueo_caja import ArqueoCaja
-from .categoria import Categoria
\ No newline at end of file
+from .categoria import Categoria
+from .resumen_diario import ResumenDiario
+from .idempotencia import Idempotencia
\ No newline at end of file
@@ -6,7 +6,7 @@ class Consumo(Base):
     __tablename__ = "consumos"
 
     id = Column(Integer, primary_key=True, index=True)
-    turno_id = Column(Integer, ForeignKey("turnos.id"))
+    turno_id = Column(Integer, ForeignKey("turnos.id"), index=True)
     producto_id = Column(Integer, ForeignKey("productos.id"))
 
     cantidad = Column(Integer, nullable=False)
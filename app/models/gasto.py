@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
 from app.database import Base
 from datetime import datetime
 import pytz
@@ -14,3 +14,8 @@ class Gasto(Base):
     cantidad = Column(Integer, nullable=False, default=1)
     total = Column(Float, nullable=False, default=0)
     created_at = Column(DateTime, default=lambda: datetime.now(BO).replace(tzinfo=None))
+
+    __table_args__ = (
+        # listado paginado (keyset) del más nuevo al más viejo
+        Index("ix_gastos_created_at_id", "created_at", "id"),
+    )
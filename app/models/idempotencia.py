@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, JSON
+from app.database import Base
+
+class Idempotencia(Base):
+    """
+    Primera respuesta de un request con Idempotency-Key (ver app/utils/idempotencia.py).
+    Los reintentos con la misma clave reciben esta respuesta sin volver a ejecutarse.
+    """
+    __tablename__ = "idempotencia"
+
+    clave = Column(String(255), primary_key=True)  # "u<id>:<Idempotency-Key>" ("anon:" sin token)
+    huella = Column(String(64), nullable=False)  # sha256(método + ruta + body)
+
+    estado = Column(String, nullable=False, default="en_curso")  # en_curso | completo
+    status_code = Column(Integer, nullable=True)
+    headers = Column(JSON, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+
+    creado = Column(DateTime, nullable=False)
+    expira = Column(DateTime, nullable=False, index=True)
@@ -13,3 +13,8 @@ class Mesa(Base):
     hora_fin = Column(DateTime, nullable=True)
 
     imagen = Column(String, nullable=True)
+
+    # control de concurrencia optimista: cada UPDATE lleva WHERE version = :leida
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
@@ -1,6 +1,7 @@
 from sqlalchemy import Column, Integer, String, Float, ForeignKey
 from app.database import Base
 from sqlalchemy.orm import relationship
+from app.utils.uploads import variante_url
 
 class Producto(Base):
     __tablename__ = "productos"
@@ -20,3 +21,8 @@ class Producto(Base):
     # categoria
     categoria_id = Column(Integer, ForeignKey("categorias.id"), nullable=True)
     categoria = relationship("Categoria")
+
+    @property
+    def imagen_thumb(self) -> str | None:
+        # miniatura para listados (la genera app.utils.uploads en segundo plano)
+        return variante_url(self.imagen, "thumb")
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, Float, Date, UniqueConstraint
+from app.database import Base
+
+class ResumenDiario(Base):
+    """
+    Totales de turnos cerrados por (día, mesa, atendido_por, cobrado_por).
+    Se actualiza al cerrar cada turno; el día es la fecha de hora_fin.
+    Los ids de usuario/mesa usan 0 cuando el turno no tiene uno (para que la clave sea única).
+    """
+    __tablename__ = "resumen_diario"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    dia = Column(Date, nullable=False)
+    mesa_id = Column(Integer, nullable=False, default=0)
+    atendido_por_id = Column(Integer, nullable=False, default=0)
+    cobrado_por_id = Column(Integer, nullable=False, default=0)
+
+    cantidad_turnos = Column(Integer, nullable=False, default=0)
+    total_tiempo = Column(Float, nullable=False, default=0)
+    total_productos = Column(Float, nullable=False, default=0)
+    total_descuentos = Column(Float, nullable=False, default=0)
+    total_servicios_extras = Column(Float, nullable=False, default=0)
+    total_general = Column(Float, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("dia", "mesa_id", "atendido_por_id", "cobrado_por_id", name="uq_resumen_diario_clave"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Float, String
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Float, String, Index, text
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
@@ -39,3 +39,26 @@ class Turno(Base):
     atendido_por_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     cobrado_por_id = Column(Integer, ForeignKey("users.id"), nullable=True)
 
+    # control de concurrencia optimista: cada UPDATE lleva WHERE version = :leida
+    # (los UPDATE directos, como sumar_subtotal_productos, la incrementan a mano)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
+
+    __table_args__ = (
+        # turno activo por mesa (/mesas, /turnos/activos, transferir, iniciar)
+        Index(
+            "ix_turnos_activos_mesa", "mesa_id",
+            postgresql_where=text("estado IN ('abierto', 'pausado')"),
+        ),
+        # reportes por rango de cierre
+        Index(
+            "ix_turnos_cerrados_hora_fin", "hora_fin",
+            postgresql_where=text("estado = 'cerrado'"),
+        ),
+        # arqueo: turnos cerrados de un usuario en un rango
+        Index(
+            "ix_turnos_cerrados_atendido_hora_fin", "atendido_por_id", "hora_fin",
+            postgresql_where=text("estado = 'cerrado'"),
+        ),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, Index
 from app.database import Base
 
 class User(Base):
@@ -8,3 +8,12 @@ class User(Base):
     username = Column(String, unique=True, index=True)
     password_hash = Column(String)
     rol = Column(String)  # admin | empleado
+
+    __table_args__ = (
+        # búsqueda por prefijo (GET /users?username=): LIKE 'x%' no usa el índice
+        # normal con la collation por defecto, necesita varchar_pattern_ops
+        Index(
+            "ix_users_username_prefijo", "username",
+            postgresql_ops={"username": "varchar_pattern_ops"},
+        ),
+    )
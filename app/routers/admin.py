@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+
+from app.database import estado_pool
+from app.deps import require_admin
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+@router.get("/pool")
+def estado_pool_db(admin = Depends(require_admin)):
+    """
+    Conexiones en uso / libres / overflow y tiempos de espera del pool.
+    """
+    return estado_pool()
@@ -1,49 +1,90 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
 
-from app.database import get_db
+from app.database import SessionLocal
 from app.models.user import User
 from app.schemas.auth_schema import LoginSchema, TokenOut, UserAuthOut
-from app.utils.security import hash_password, verify_password, create_access_token
+from app.utils.security import hash_password_async, verify_password_async, necesita_rehash, create_access_token
+from app.utils.versiones import versiones
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
+# Login y registro son async y usan sesiones cortas: la conexión vuelve al pool
+# antes de hashear, así un pico de logins (cambio de turno) no deja al POS sin
+# conexiones ni ocupa hilos del threadpool mientras corre argon2.
+
+
+def _leer_hash(username: str) -> tuple[int, str] | None:
+    with SessionLocal() as db:
+        fila = db.execute(select(User.id, User.password_hash).where(User.username == username)).first()
+    return tuple(fila) if fila else None
+
+
+def _guardar_hash(user_id: int, viejo: str, nuevo: str):
+    # solo si nadie cambió la contraseña mientras se rehasheaba
+    with SessionLocal() as db:
+        db.execute(
+            update(User)
+            .where(User.id == user_id, User.password_hash == viejo)
+            .values(password_hash=nuevo)
+        )
+        db.commit()
+
+
+def _existe_usuario(username: str) -> bool:
+    with SessionLocal() as db:
+        return db.execute(select(User.id).where(User.username == username)).first() is not None
+
+
+def _crear_usuario(username: str, password_hash: str) -> User | None:
+    with SessionLocal() as db:
+        new_user = User(username=username, password_hash=password_hash, rol="empleado")  # rol por defecto
+        db.add(new_user)
+        try:
+            db.commit()
+        except IntegrityError:
+            # otro registro con el mismo username ganó la carrera
+            db.rollback()
+            return None
+        db.refresh(new_user)
+        return new_user
+
 
 # REGISTRO
 @router.post("/register", response_model=UserAuthOut)
-def register(data: LoginSchema, db: Session = Depends(get_db)):
+async def register(data: LoginSchema):
     # username único
-    exists = db.query(User).filter(User.username == data.username).first()
-    if exists:
+    if await run_in_threadpool(_existe_usuario, data.username):
         raise HTTPException(400, "El usuario ya existe")
 
-    new_user = User(
-        username=data.username,
-        password_hash=hash_password(data.password),
-        rol="empleado"  # por defecto
-    )
-
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    hashed = await hash_password_async(data.password)
+    new_user = await run_in_threadpool(_crear_usuario, data.username, hashed)
+    if new_user is None:
+        raise HTTPException(400, "El usuario ya existe")
 
+    versiones.bump("users")
     return new_user
 
 
 # LOGIN - usa form-data (requerido por OAuth2PasswordBearer)
 @router.post("/login", response_model=TokenOut)
-def login(form: OAuth2PasswordRequestForm = Depends(),
-          db: Session = Depends(get_db)):
-
-    user = db.query(User).filter(User.username == form.username).first()
-
-    if not user:
+async def login(form: OAuth2PasswordRequestForm = Depends()):
+    fila = await run_in_threadpool(_leer_hash, form.username)
+    if not fila:
         raise HTTPException(401, "Usuario no encontrado")
+    user_id, password_hash = fila
 
-    if not verify_password(form.password, user.password_hash):
+    if not await verify_password_async(form.password, password_hash):
         raise HTTPException(401, "Contraseña incorrecta")
 
-    token = create_access_token({"sub": str(user.id)})
+    # hashes viejos (bcrypt o argon2 con otros parámetros) se actualizan al entrar
+    if necesita_rehash(password_hash):
+        nuevo = await hash_password_async(form.password)
+        await run_in_threadpool(_guardar_hash, user_id, password_hash, nuevo)
+
+    token = create_access_token({"sub": str(user_id)})
 
     return TokenOut(access_token=token)
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.categoria import Categoria
 from app.schemas.categoria_schema import CategoriaCreate, CategoriaUpdate, CategoriaOut
+from app.utils.versiones import versiones, no_modificado
+from app.utils.catalogo import catalogo
 
 router = APIRouter(prefix="/categorias", tags=["Categorias"])
 
@@ -17,12 +19,23 @@ def crear_categoria(data: CategoriaCreate, db: Session = Depends(get_db)):
     cat = Categoria(nombre=nombre)
     db.add(cat)
     db.commit()
+    versiones.bump("categorias")
     db.refresh(cat)
+    catalogo.guardar_categoria(cat)
     return cat
 
 @router.get("/", response_model=list[CategoriaOut])
-def listar_categorias(db: Session = Depends(get_db)):
-    return db.query(Categoria).order_by(Categoria.nombre.asc()).all()
+def listar_categorias(request: Request, response: Response, db: Session = Depends(get_db)):
+    no_mod = no_modificado(request, response, "categorias")
+    if no_mod:
+        return no_mod
+
+    if not catalogo.cargado:
+        catalogo.cargar(db)
+    contenido = catalogo.categorias_json()
+    if contenido is None:
+        return db.query(Categoria).order_by(Categoria.nombre.asc()).all()
+    return Response(content=contenido, media_type="application/json", headers=dict(response.headers))
 
 @router.put("/{categoria_id}", response_model=CategoriaOut)
 def actualizar_categoria(categoria_id: int, data: CategoriaUpdate, db: Session = Depends(get_db)):
@@ -42,7 +55,9 @@ def actualizar_categoria(categoria_id: int, data: CategoriaUpdate, db: Session =
         cat.nombre = nombre
 
     db.commit()
+    versiones.bump("categorias", "productos")
     db.refresh(cat)
+    catalogo.guardar_categoria(cat)
     return cat
 
 @router.delete("/{categoria_id}")
@@ -53,4 +68,6 @@ def eliminar_categoria(categoria_id: int, db: Session = Depends(get_db)):
 
     db.delete(cat)
     db.commit()
+    versiones.bump("categorias", "productos")
+    catalogo.eliminar_categoria(categoria_id)
     return {"mensaje": "Categoría eliminada"}
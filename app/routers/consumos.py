@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_db, get_db_pos
 from app.models.consumo import Consumo
-from app.models.turno import Turno
-from app.models.producto import Producto
 from app.schemas.consumo_schema import ConsumoCreate, ConsumoOut
+from app.utils.versiones import versiones
+from app.utils.catalogo import catalogo
+from app.utils.idempotencia import idempotente
+from app.utils.stock import mover_stock, devolver_stock, sumar_subtotal_productos
+from app.utils.paginacion import PaginaQuery, codificar_cursor, decodificar_cursor, poner_siguiente
 
 router = APIRouter(prefix="/consumos", tags=["Consumos"])
 
@@ -13,28 +16,17 @@ router = APIRouter(prefix="/consumos", tags=["Consumos"])
 # =========================
 # REGISTRAR CONSUMO
 # =========================
-@router.post("/", response_model=ConsumoOut)
-def registrar_consumo(data: ConsumoCreate, db: Session = Depends(get_db)):
-    # 🔎 Validar turno
-    turno = db.query(Turno).filter(
-        Turno.id == data.turno_id,
-        Turno.estado == "abierto"
-    ).first()
-    if not turno:
-        raise HTTPException(status_code=404, detail="Turno no encontrado o cerrado")
-
-    # 🔎 Validar producto
-    producto = db.query(Producto).filter(Producto.id == data.producto_id).first()
-    if not producto:
-        raise HTTPException(status_code=404, detail="Producto no encontrado")
-
-    # ✅ Validar cantidad disponible
-    if producto.cantidad < data.cantidad:
-        raise HTTPException(status_code=400, detail="Stock insuficiente")
+@router.post("/", response_model=ConsumoOut, dependencies=[Depends(idempotente)])
+def registrar_consumo(data: ConsumoCreate, db: Session = Depends(get_db_pos)):
+    # ✅ Descontar inventario (UPDATE condicional: valida producto y stock en la misma sentencia)
+    producto = mover_stock(db, data.producto_id, -data.cantidad)
 
     # ✅ Usar PRECIO DE VENTA
     subtotal = producto.precio_venta * data.cantidad
 
+    # ✅ Actualizar subtotal del turno (en la base, solo si sigue abierto)
+    sumar_subtotal_productos(db, data.turno_id, subtotal, estados=("abierto",), detalle="Turno no encontrado o cerrado")
+
     consumo = Consumo(
         turno_id=data.turno_id,
         producto_id=data.producto_id,
@@ -42,14 +34,10 @@ def registrar_consumo(data: ConsumoCreate, db: Session = Depends(get_db)):
         subtotal=subtotal
     )
 
-    # ✅ Descontar inventario
-    producto.cantidad -= data.cantidad
-
-    # ✅ Actualizar subtotal del turno
-    turno.subtotal_productos += subtotal
-
     db.add(consumo)
     db.commit()
+    versiones.bump("productos")
+    catalogo.fijar_stock(data.producto_id, producto.cantidad, producto.orden)
     db.refresh(consumo)
 
     return consumo
@@ -59,24 +47,45 @@ def registrar_consumo(data: ConsumoCreate, db: Session = Depends(get_db)):
 # LISTAR CONSUMOS POR TURNO
 # =========================
 @router.get("/turno/{turno_id}", response_model=list[ConsumoOut])
-def obtener_consumos(turno_id: int, db: Session = Depends(get_db)):
-    return db.query(Consumo).filter(Consumo.turno_id == turno_id).all()
+def obtener_consumos(
+    turno_id: int,
+    response: Response,
+    cursor: str | None = None,
+    limit: int = PaginaQuery,
+    db: Session = Depends(get_db),
+):
+    query = db.query(Consumo).filter(Consumo.turno_id == turno_id)
+    if cursor:
+        (ultimo_id,) = decodificar_cursor(cursor, int)
+        query = query.filter(Consumo.id > ultimo_id)
+
+    query = query.order_by(Consumo.id)
+
+    consumos = query.limit(limit + 1).all()
+    if len(consumos) > limit:
+        consumos = consumos[:limit]
+        poner_siguiente(response, codificar_cursor(consumos[-1].id))
+    return consumos
 
 
 # =========================
 # ELIMINAR CONSUMO
 # =========================
 @router.delete("/{consumo_id}")
-def eliminar_consumo(consumo_id: int, db: Session = Depends(get_db)):
+def eliminar_consumo(consumo_id: int, db: Session = Depends(get_db_pos)):
     consumo = db.query(Consumo).filter(Consumo.id == consumo_id).first()
     if not consumo:
         raise HTTPException(status_code=404, detail="Consumo no encontrado")
 
+    producto_id = consumo.producto_id
+    cantidad = consumo.cantidad
+
     # (opcional pro) devolver stock al eliminar consumo
-    producto = db.query(Producto).filter(Producto.id == consumo.producto_id).first()
-    if producto:
-        producto.cantidad += consumo.cantidad
+    devuelto = devolver_stock(db, producto_id, cantidad)
 
     db.delete(consumo)
     db.commit()
+    versiones.bump("productos")
+    if devuelto:
+        catalogo.fijar_stock(producto_id, devuelto.cantidad, devuelto.orden)
     return {"mensaje": "Consumo eliminado"}
@@ -0,0 +1,61 @@
+import asyncio
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from app.database import AsyncSessionLocal
+from app.routers.mesas import snapshot_mesas_stmt, mesa_to_dict
+from app.utils.eventos import bus, evento_json
+
+router = APIRouter(prefix="/ws", tags=["Tiempo real"])
+
+PING_CADA_SEG = 25
+
+
+async def _enviar_eventos(websocket: WebSocket, cola: asyncio.Queue):
+    while True:
+        try:
+            evento = await asyncio.wait_for(cola.get(), timeout=PING_CADA_SEG)
+        except asyncio.TimeoutError:
+            evento = {"tipo": "ping"}
+        await websocket.send_text(evento_json(evento))
+
+
+async def _esperar_cierre(websocket: WebSocket):
+    # el cliente no manda nada útil; solo detectamos cuándo se desconecta
+    while True:
+        await websocket.receive_text()
+
+
+@router.websocket("/floor")
+async def floor(websocket: WebSocket):
+    """
+    Estado del salón en tiempo real.
+    Al conectar se envía {"tipo": "snapshot", "mesas": [...]} (mismo formato que GET /mesas)
+    y después solo los cambios de cada mesa/turno. {"tipo": "resync"} = volver a pedir /mesas.
+    """
+    await websocket.accept()
+
+    # suscribir antes del snapshot para no perder cambios intermedios
+    cola = bus.suscribir()
+    try:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(snapshot_mesas_stmt())).all()
+        await websocket.send_text(evento_json({
+            "tipo": "snapshot",
+            "mesas": [mesa_to_dict(mesa, turno) for (mesa, turno) in rows],
+        }))
+
+        tareas = [
+            asyncio.create_task(_enviar_eventos(websocket, cola)),
+            asyncio.create_task(_esperar_cierre(websocket)),
+        ]
+        listas, pendientes = await asyncio.wait(tareas, return_when=asyncio.FIRST_COMPLETED)
+        for t in pendientes:
+            t.cancel()
+        for t in listas:
+            # WebSocketDisconnect u otro error de envío: la conexión terminó
+            t.exception()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        bus.desuscribir(cola)
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 from datetime import datetime
 import pytz
@@ -9,6 +10,8 @@ from app.schemas.gasto_schema import GastoCreate, GastoOut
 
 from app.deps import get_current_user
 from app.models.user import User
+from app.utils.fechas import parse_fecha
+from app.utils.paginacion import PaginaQuery, codificar_cursor, decodificar_cursor, poner_siguiente
 
 router = APIRouter(prefix="/gastos", tags=["Gastos"])
 BO = pytz.timezone("America/La_Paz")
@@ -19,11 +22,35 @@ def require_admin(current_user: User):
 
 @router.get("/", response_model=list[GastoOut])
 def listar_gastos(
+    response: Response,
+    desde: str | None = None,
+    hasta: str | None = None,
+    cursor: str | None = None,
+    limit: int = PaginaQuery,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     require_admin(current_user)
-    return db.query(Gasto).order_by(Gasto.created_at.desc()).all()
+
+    query = db.query(Gasto)
+
+    if desde:
+        query = query.filter(Gasto.created_at >= parse_fecha(desde).replace(hour=0, minute=0, second=0, microsecond=0))
+    if hasta:
+        query = query.filter(Gasto.created_at <= parse_fecha(hasta).replace(hour=23, minute=59, second=59, microsecond=999999))
+
+    # keyset: (created_at, id) del último gasto de la página anterior
+    if cursor:
+        created_at, gasto_id = decodificar_cursor(cursor, datetime.fromisoformat, int)
+        query = query.filter(tuple_(Gasto.created_at, Gasto.id) < tuple_(created_at, gasto_id))
+
+    query = query.order_by(Gasto.created_at.desc(), Gasto.id.desc())
+
+    gastos = query.limit(limit + 1).all()
+    if len(gastos) > limit:
+        gastos = gastos[:limit]
+        poner_siguiente(response, codificar_cursor(gastos[-1].created_at, gastos[-1].id))
+    return gastos
 
 @router.post("/", response_model=GastoOut)
 def crear_gasto(
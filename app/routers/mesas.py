@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.orm.exc import StaleDataError
+from app.config import settings
+from app.database import get_db, get_async_db
 from app.models.mesa import Mesa
 from app.models.turno import Turno
 from app.schemas.mesa_schema import MesaCreate, MesaUpdate, MesaOut
-
-from pathlib import Path
-from uuid import uuid4
+from app.utils.versiones import versiones, no_modificado
+from app.utils.uploads import guardar_imagen
 
 router = APIRouter(prefix="/mesas", tags=["Mesas"])
 
@@ -22,6 +25,7 @@ def create_mesa(data: MesaCreate, db: Session = Depends(get_db)):
     )
     db.add(mesa)
     db.commit()
+    versiones.bump("mesas")
     db.refresh(mesa)
     return mesa
 
@@ -34,23 +38,7 @@ def create_mesa_con_imagen(
     imagen: UploadFile | None = File(None),
     db: Session = Depends(get_db)
 ):
-    imagen_url = None
-
-    if imagen:
-        uploads_dir = Path(__file__).resolve().parents[1] / "static" / "uploads" / "mesas"
-        uploads_dir.mkdir(parents=True, exist_ok=True)
-
-        ext = Path(imagen.filename).suffix.lower()
-        if ext not in [".jpg", ".jpeg", ".png", ".webp"]:
-            raise HTTPException(status_code=400, detail="Formato de imagen no permitido")
-
-        filename = f"{uuid4().hex}{ext}"
-        filepath = uploads_dir / filename
-
-        with open(filepath, "wb") as f:
-            f.write(imagen.file.read())
-
-        imagen_url = f"/static/uploads/mesas/{filename}"
+    imagen_url = guardar_imagen(imagen, "mesas") if imagen else None
 
     mesa = Mesa(
         nombre=nombre,
@@ -61,40 +49,70 @@ def create_mesa_con_imagen(
 
     db.add(mesa)
     db.commit()
+    versiones.bump("mesas")
     db.refresh(mesa)
     return mesa
 
 
 
-@router.get("/", response_model=list[MesaOut])
-def listar_mesas(db: Session = Depends(get_db)):
-    mesas = db.query(Mesa).all()
-    resultado = []
+def snapshot_mesas_stmt():
+    """
+    Todas las mesas + su turno activo (abierto/pausado) en UNA sola consulta.
+    Si una mesa tuviera más de un turno activo se toma el más reciente (id mayor).
+    """
+    ultimo_activo = (
+        select(Turno.mesa_id, func.max(Turno.id).label("turno_id"))
+        .where(Turno.estado.in_(["abierto", "pausado"]))
+        .group_by(Turno.mesa_id)
+        .subquery()
+    )
+    return (
+        select(Mesa, Turno)
+        .outerjoin(ultimo_activo, ultimo_activo.c.mesa_id == Mesa.id)
+        .outerjoin(Turno, Turno.id == ultimo_activo.c.turno_id)
+        .order_by(Mesa.id)
+    )
+
+
+def mesa_to_dict(mesa: Mesa, turno_activo: Turno | None):
+    return {
+        "id": mesa.id,
+        "nombre": mesa.nombre,
+        "estado": mesa.estado,
+        "tarifa_por_hora": mesa.tarifa_por_hora,
+
+        "hora_inicio": turno_activo.hora_inicio if turno_activo else None,
+        "turno_activo": turno_activo.id if turno_activo else None,
+        "turno_estado": turno_activo.estado if turno_activo else None,
 
-    for mesa in mesas:
-        turno_activo = db.query(Turno).filter(
-            Turno.mesa_id == mesa.id,
-            Turno.estado.in_(["abierto", "pausado"])
-        ).order_by(Turno.id.desc()).first()
+        # ✅ CLAVE para que el timer NO corra al recargar
+        "pausa_inicio": turno_activo.pausa_inicio if turno_activo else None,
+        "pausa_acumulada_seg": int(turno_activo.pausa_acumulada_seg or 0) if turno_activo else 0,
 
-        resultado.append({
-            "id": mesa.id,
-            "nombre": mesa.nombre,
-            "estado": mesa.estado,
-            "tarifa_por_hora": mesa.tarifa_por_hora,
+        "imagen": mesa.imagen,
+        "version": mesa.version,
+    }
 
-            "hora_inicio": turno_activo.hora_inicio if turno_activo else None,
-            "turno_activo": turno_activo.id if turno_activo else None,
-            "turno_estado": turno_activo.estado if turno_activo else None,
 
-            # ✅ CLAVE para que el timer NO corra al recargar
-            "pausa_inicio": turno_activo.pausa_inicio if turno_activo else None,
-            "pausa_acumulada_seg": int(turno_activo.pausa_acumulada_seg or 0) if turno_activo else 0,
+def listar_mesas(request: Request, response: Response, db: Session = Depends(get_db)):
+    no_mod = no_modificado(request, response, "mesas")
+    if no_mod:
+        return no_mod
+    rows = db.execute(snapshot_mesas_stmt()).all()
+    return [mesa_to_dict(mesa, turno_activo) for (mesa, turno_activo) in rows]
 
-            "imagen": mesa.imagen,
-        })
 
-    return resultado
+async def listar_mesas_async(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    no_mod = no_modificado(request, response, "mesas")
+    if no_mod:
+        return no_mod
+    rows = (await db.execute(snapshot_mesas_stmt())).all()
+    return [mesa_to_dict(mesa, turno_activo) for (mesa, turno_activo) in rows]
+
+
+router.get("/", response_model=list[MesaOut])(
+    listar_mesas_async if settings.DB_ASYNC_LECTURAS else listar_mesas
+)
 
 
 @router.put("/{mesa_id}", response_model=MesaOut)
@@ -106,7 +124,12 @@ def actualizar_mesa(mesa_id: int, data: MesaUpdate, db: Session = Depends(get_db
     for field, value in data.model_dump(exclude_unset=True).items():
         setattr(mesa, field, value)
 
-    db.commit()
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="La mesa fue modificada por otra operación, reintente")
+    versiones.bump("mesas")
     db.refresh(mesa)
     return mesa
 
@@ -119,4 +142,5 @@ def eliminar_mesa(mesa_id: int, db: Session = Depends(get_db)):
 
     db.delete(mesa)
     db.commit()
+    versiones.bump("mesas")
     return {"mensaje": "Mesa eliminada"}
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.database import estado_pool
+from app.utils.metricas import exponer_metricas
+
+router = APIRouter(tags=["Métricas"])
+
+CONTENT_TYPE_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _metricas_pool() -> list[str]:
+    pool = estado_pool()
+    lineas = []
+    for nombre, ayuda, sync, asinc in (
+        ("db_pool_checked_out", "Conexiones del pool en uso.", pool["checked_out"], pool["async"]["checked_out"]),
+        ("db_pool_idle", "Conexiones del pool libres.", pool["idle"], pool["async"]["idle"]),
+        ("db_pool_overflow", "Conexiones de overflow abiertas.", pool["overflow"], pool["async"]["overflow"]),
+    ):
+        lineas += [
+            f"# HELP {nombre} {ayuda}",
+            f"# TYPE {nombre} gauge",
+            f'{nombre}{{engine="sync"}} {sync}',
+            f'{nombre}{{engine="async"}} {asinc}',
+        ]
+    lineas += [
+        "# HELP db_pool_timeouts_total Requests que no consiguieron conexión a tiempo.",
+        "# TYPE db_pool_timeouts_total counter",
+        f"db_pool_timeouts_total {pool['timeouts']}",
+    ]
+    return lineas
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metricas(authorization: str | None = Header(default=None)):
+    """
+    Métricas en formato texto de Prometheus. Con METRICAS_TOKEN definido se pide
+    `Authorization: Bearer <token>` (el scraper no usa los JWT de usuarios).
+    """
+    if settings.METRICAS_TOKEN and authorization != f"Bearer {settings.METRICAS_TOKEN}":
+        raise HTTPException(status_code=401, detail="No autorizado")
+
+    return PlainTextResponse(exponer_metricas(_metricas_pool()), media_type=CONTENT_TYPE_PROMETHEUS)
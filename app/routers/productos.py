@@ -1,29 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
-from pathlib import Path
-from uuid import uuid4
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, get_async_db
 from app.models.producto import Producto
 from app.models.categoria import Categoria
 from app.schemas.producto_schema import (
     ProductoCreate, ProductoUpdate, ProductoOut, ProductoStockDelta
 )
+from app.utils.versiones import versiones, no_modificado
+from app.utils.catalogo import catalogo
+from app.utils.uploads import guardar_imagen
+from app.utils.stock import mover_stock
+from app.utils.paginacion import LimitQuery, codificar_cursor, decodificar_cursor, poner_siguiente
 
 router = APIRouter(prefix="/productos", tags=["Productos"])
 
 
+def _validar_categoria(db: Session, categoria_id: int | None):
+    if categoria_id is None:
+        return
+
+    # primero el catálogo en memoria; la base solo si todavía no se cargó
+    existe = catalogo.existe_categoria(categoria_id)
+    if existe is None:
+        existe = db.query(Categoria.id).filter(Categoria.id == categoria_id).first() is not None
+
+    if not existe:
+        raise HTTPException(status_code=404, detail="Categoría no encontrada")
+
+
 @router.post("/", response_model=ProductoOut)
 def crear_producto(data: ProductoCreate, db: Session = Depends(get_db)):
-    if data.categoria_id is not None:
-        cat = db.query(Categoria).filter(Categoria.id == data.categoria_id).first()
-        if not cat:
-            raise HTTPException(status_code=404, detail="Categoría no encontrada")
+    _validar_categoria(db, data.categoria_id)
 
     producto = Producto(**data.model_dump())
     db.add(producto)
     db.commit()
+    versiones.bump("productos")
     db.refresh(producto)
+    catalogo.guardar_producto(producto)
     return producto
 
 
@@ -37,28 +55,9 @@ def crear_producto_con_imagen(
     imagen: UploadFile | None = File(None),
     db: Session = Depends(get_db),
 ):
-    imagen_url = None
-
-    if imagen:
-        uploads_dir = Path(__file__).resolve().parents[1] / "static" / "uploads" / "productos"
-        uploads_dir.mkdir(parents=True, exist_ok=True)
-
-        ext = Path(imagen.filename).suffix.lower()
-        if ext not in [".jpg", ".jpeg", ".png", ".webp"]:
-            raise HTTPException(status_code=400, detail="Formato de imagen no permitido")
+    _validar_categoria(db, categoria_id)
 
-        filename = f"{uuid4().hex}{ext}"
-        filepath = uploads_dir / filename
-
-        with open(filepath, "wb") as f:
-            f.write(imagen.file.read())
-
-        imagen_url = f"/static/uploads/productos/{filename}"
-
-    if categoria_id is not None:
-        cat = db.query(Categoria).filter(Categoria.id == categoria_id).first()
-        if not cat:
-            raise HTTPException(status_code=404, detail="Categoría no encontrada")
+    imagen_url = guardar_imagen(imagen, "productos") if imagen else None
 
     producto = Producto(
         nombre=nombre,
@@ -71,13 +70,109 @@ def crear_producto_con_imagen(
 
     db.add(producto)
     db.commit()
+    versiones.bump("productos")
     db.refresh(producto)
+    catalogo.guardar_producto(producto)
     return producto
 
 
-@router.get("/", response_model=list[ProductoOut])
-def listar_productos(db: Session = Depends(get_db)):
-    return db.query(Producto).options(joinedload(Producto.categoria)).all()
+def _productos_stmt(categoria_id: int | None, nombre: str | None, despues_de: int | None, limit: int | None):
+    stmt = select(Producto).options(joinedload(Producto.categoria))
+    if categoria_id is not None:
+        stmt = stmt.where(Producto.categoria_id == categoria_id)
+    if nombre:
+        stmt = stmt.where(func.lower(Producto.nombre).startswith(nombre.strip().lower(), autoescape=True))
+    if despues_de is not None:
+        stmt = stmt.where(Producto.id > despues_de)
+
+    stmt = stmt.order_by(Producto.id)
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+    return stmt
+
+
+def _respuesta_catalogo(
+    response: Response, categoria_id: int | None, nombre: str | None, despues_de: int | None, limit: int | None
+) -> Response | None:
+    """
+    Respuesta armada desde el catálogo en memoria (None si no está disponible).
+    """
+    if categoria_id is None and not nombre and despues_de is None and limit is None:
+        contenido = catalogo.productos_json()
+        siguiente = None
+    else:
+        pagina = catalogo.productos_pagina(categoria_id, nombre, despues_de, limit)
+        contenido, siguiente = pagina if pagina else (None, None)
+
+    if contenido is None:
+        return None
+
+    poner_siguiente(response, codificar_cursor(siguiente) if siguiente else None)
+    return Response(content=contenido, media_type="application/json", headers=dict(response.headers))
+
+
+def _pagina_db(response: Response, productos: list[Producto], limit: int | None) -> list[Producto]:
+    if limit is not None and len(productos) > limit:
+        productos = productos[:limit]
+        poner_siguiente(response, codificar_cursor(productos[-1].id))
+    return productos
+
+
+def listar_productos(
+    request: Request,
+    response: Response,
+    categoria_id: int | None = None,
+    nombre: str | None = None,
+    cursor: str | None = None,
+    limit: int | None = LimitQuery,
+    db: Session = Depends(get_db),
+):
+    no_mod = no_modificado(request, response, "productos")
+    if no_mod:
+        return no_mod
+
+    despues_de = decodificar_cursor(cursor, int)[0] if cursor else None
+
+    if not catalogo.cargado:
+        catalogo.cargar(db)
+    respuesta = _respuesta_catalogo(response, categoria_id, nombre, despues_de, limit)
+    if respuesta is not None:
+        return respuesta
+
+    # una escritura invalidó la carga justo ahora: respondemos desde la base
+    productos = db.scalars(_productos_stmt(categoria_id, nombre, despues_de, limit)).all()
+    return _pagina_db(response, list(productos), limit)
+
+
+async def listar_productos_async(
+    request: Request,
+    response: Response,
+    categoria_id: int | None = None,
+    nombre: str | None = None,
+    cursor: str | None = None,
+    limit: int | None = LimitQuery,
+    db: AsyncSession = Depends(get_async_db),
+):
+    no_mod = no_modificado(request, response, "productos")
+    if no_mod:
+        return no_mod
+
+    despues_de = decodificar_cursor(cursor, int)[0] if cursor else None
+
+    if not catalogo.cargado:
+        await catalogo.cargar_async(db)
+    respuesta = _respuesta_catalogo(response, categoria_id, nombre, despues_de, limit)
+    if respuesta is not None:
+        return respuesta
+
+    # una escritura invalidó la carga justo ahora: respondemos desde la base
+    productos = (await db.scalars(_productos_stmt(categoria_id, nombre, despues_de, limit))).all()
+    return _pagina_db(response, list(productos), limit)
+
+
+router.get("/", response_model=list[ProductoOut])(
+    listar_productos_async if settings.DB_ASYNC_LECTURAS else listar_productos
+)
 
 
 @router.get("/{producto_id}", response_model=ProductoOut)
@@ -95,23 +190,24 @@ def obtener_producto(producto_id: int, db: Session = Depends(get_db)):
 
 @router.put("/{producto_id}", response_model=ProductoOut)
 def actualizar_producto(producto_id: int, data: ProductoUpdate, db: Session = Depends(get_db)):
-    producto = db.query(Producto).filter(Producto.id == producto_id).first()
-    if not producto:
-        raise HTTPException(status_code=404, detail="Producto no encontrado")
-
     data_dict = data.model_dump(exclude_unset=True)
 
     # ✅ validar categoria_id si viene (y no es null)
-    if "categoria_id" in data_dict and data_dict["categoria_id"] is not None:
-        cat = db.query(Categoria).filter(Categoria.id == data_dict["categoria_id"]).first()
-        if not cat:
-            raise HTTPException(status_code=404, detail="Categoría no encontrada")
+    _validar_categoria(db, data_dict.get("categoria_id"))
+
+    # fila bloqueada hasta el commit: el orden del catálogo queda igual que en la base
+    producto = db.query(Producto).filter(Producto.id == producto_id).with_for_update().first()
+    if not producto:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
 
     for field, value in data_dict.items():
         setattr(producto, field, value)
 
+    orden = catalogo.orden_stock()
     db.commit()
+    versiones.bump("productos")
     db.refresh(producto)
+    catalogo.guardar_producto(producto, orden)
     return producto
 
 
@@ -121,43 +217,40 @@ def actualizar_imagen_producto(
     imagen: UploadFile = File(...),
     db: Session = Depends(get_db),
 ):
-    producto = db.query(Producto).filter(Producto.id == producto_id).first()
-    if not producto:
+    if not db.query(Producto.id).filter(Producto.id == producto_id).first():
         raise HTTPException(status_code=404, detail="Producto no encontrado")
 
-    uploads_dir = Path(__file__).resolve().parents[1] / "static" / "uploads" / "productos"
-    uploads_dir.mkdir(parents=True, exist_ok=True)
+    imagen_url = guardar_imagen(imagen, "productos")
 
-    ext = Path(imagen.filename).suffix.lower()
-    if ext not in [".jpg", ".jpeg", ".png", ".webp"]:
-        raise HTTPException(status_code=400, detail="Formato de imagen no permitido")
-
-    filename = f"{uuid4().hex}{ext}"
-    filepath = uploads_dir / filename
-
-    with open(filepath, "wb") as f:
-        f.write(imagen.file.read())
+    # igual que actualizar_producto: el orden se toma con la fila bloqueada
+    # (después de guardar la imagen, para no tener la fila bloqueada mientras se sube)
+    producto = db.query(Producto).filter(Producto.id == producto_id).with_for_update().first()
+    if not producto:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
 
-    producto.imagen = f"/static/uploads/productos/{filename}"
+    producto.imagen = imagen_url
+    orden = catalogo.orden_stock()
     db.commit()
+    versiones.bump("productos")
     db.refresh(producto)
+    catalogo.guardar_producto(producto, orden)
     return producto
 
 
 @router.patch("/{producto_id}/stock", response_model=ProductoOut)
 def ajustar_stock(producto_id: int, data: ProductoStockDelta, db: Session = Depends(get_db)):
-    producto = db.query(Producto).filter(Producto.id == producto_id).first()
-    if not producto:
-        raise HTTPException(status_code=404, detail="Producto no encontrado")
-
-    nueva_cantidad = (producto.cantidad or 0) + data.delta
-    if nueva_cantidad < 0:
-        raise HTTPException(status_code=400, detail="Stock insuficiente")
-
-    producto.cantidad = nueva_cantidad
+    # delta aplicado en la base (cantidad = cantidad + delta, nunca por debajo de 0)
+    movimiento = mover_stock(db, producto_id, data.delta)
     db.commit()
-    db.refresh(producto)
-    return producto
+    versiones.bump("productos")
+    catalogo.fijar_stock(producto_id, movimiento.cantidad, movimiento.orden)
+
+    return (
+        db.query(Producto)
+        .options(joinedload(Producto.categoria))
+        .filter(Producto.id == producto_id)
+        .first()
+    )
 
 
 @router.delete("/{producto_id}")
@@ -168,4 +261,6 @@ def eliminar_producto(producto_id: int, db: Session = Depends(get_db)):
 
     db.delete(producto)
     db.commit()
+    versiones.bump("productos")
+    catalogo.eliminar_producto(producto_id)
     return {"mensaje": "Producto eliminado"}
@@ -1,27 +1,34 @@
 # app/routers/reportes.py
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session, aliased
-from datetime import datetime
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session, aliased, joinedload, selectinload
+from datetime import datetime, timedelta
+from itertools import groupby
+import csv
+import io
+import json
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_db_reportes, SessionLocal
 from app.models.turno import Turno
+from app.models.mesa import Mesa
+from app.models.consumo import Consumo
+from app.models.producto import Producto
 from app.models.user import User
-from app.schemas.report_schema import ReporteOut, ReporteTurno, ReporteConsumo
+from app.models.resumen_diario import ResumenDiario
+from app.schemas.report_schema import (
+    ReporteOut, ResumenOut, ResumenPeriodo, ResumenGrupo
+)
+from app.utils.fechas import parse_fecha
+from app.utils.totales import columnas_totales, fila_totales, totales_turnos
+from app.utils.resumen_diario import columnas_totales_diario, filtros_diario
+from app.utils.respuestas import json_default, respuesta_json
 
 router = APIRouter(prefix="/reportes", tags=["Reportes"])
 
 
-def parse_fecha(fecha_str: str) -> datetime:
-    """
-    Recibe "2025-11-20" o "20/11/2025" y lo convierte a datetime.
-    """
-    if "/" in fecha_str:
-        d, m, y = fecha_str.split("/")
-        return datetime(int(y), int(m), int(d))
-    return datetime.fromisoformat(fecha_str)
-
-
 def user_label(u: User | None) -> str | None:
     """
     Devuelve un nombre amigable del usuario (según campos disponibles).
@@ -36,16 +43,67 @@ def user_label(u: User | None) -> str | None:
     )
 
 
+def rango_fechas(fecha_inicio: str, fecha_fin: str) -> tuple[datetime, datetime]:
+    """
+    Convierte las fechas del reporte al inicio y al final del día.
+    """
+    fecha_inicio_dt = parse_fecha(fecha_inicio).replace(hour=0, minute=0, second=0, microsecond=0)
+    fecha_fin_dt = parse_fecha(fecha_fin).replace(hour=23, minute=59, second=59, microsecond=999999)
+    return fecha_inicio_dt, fecha_fin_dt
+
+
+def filtros_cerrados(fecha_inicio_dt: datetime, fecha_fin_dt: datetime, mesa_id: int | None = None) -> list:
+    """
+    Condiciones comunes: solo turnos cerrados dentro del rango. El turno cuenta
+    en el día de su hora_fin (igual que resumen_diario y el arqueo), aunque
+    haya empezado antes de medianoche.
+    """
+    filtros = [
+        Turno.hora_fin >= fecha_inicio_dt,
+        Turno.hora_fin <= fecha_fin_dt,
+        Turno.estado == "cerrado",
+    ]
+    if mesa_id is not None:
+        filtros.append(Turno.mesa_id == mesa_id)
+    return filtros
+
+
+def _reporte_turno_dict(t: Turno, u_at: User | None, u_co: User | None) -> dict:
+    """
+    Una fila de ReporteTurno como dict plano (se serializa directo, sin pasar por pydantic).
+    """
+    return {
+        "mesa": t.mesa.nombre if getattr(t, "mesa", None) else str(t.mesa_id),  # mesa seguro
+        "atendido_por": user_label(u_at),
+        "facturado_por": user_label(u_co),
+        "hora_inicio": t.hora_inicio,
+        "hora_fin": t.hora_fin,
+        "tiempo_total_min": int((t.hora_fin - t.hora_inicio).total_seconds() / 60),
+        "subtotal_tiempo": float(t.subtotal_tiempo or 0),
+        "subtotal_productos": float(t.subtotal_productos or 0),
+        "descuento": float(t.descuento or 0),
+        "servicios_extras": float(getattr(t, "servicios_extras", 0) or 0),
+        "total_final": float(t.total_final or 0),
+        "consumos": [
+            {
+                "producto_nombre": c.producto.nombre,
+                "cantidad": c.cantidad,
+                "subtotal": float(c.subtotal),
+            }
+            for c in (t.consumos or [])
+        ],
+    }
+
+
 @router.get("/", response_model=ReporteOut)
 def reporte_turnos(
     fecha_inicio: str,
     fecha_fin: str,
     mesa_id: int | None = Query(default=None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_reportes),
 ):
     # Convertimos fechas al inicio y final del día
-    fecha_inicio_dt = parse_fecha(fecha_inicio).replace(hour=0, minute=0, second=0, microsecond=0)
-    fecha_fin_dt = parse_fecha(fecha_fin).replace(hour=23, minute=59, second=59, microsecond=999999)
+    fecha_inicio_dt, fecha_fin_dt = rango_fechas(fecha_inicio, fecha_fin)
 
     # Aliases para poder hacer join a users 2 veces
     UAtiende = aliased(User)
@@ -56,69 +114,347 @@ def reporte_turnos(
         db.query(Turno, UAtiende, UCobra)
         .outerjoin(UAtiende, Turno.atendido_por_id == UAtiende.id)
         .outerjoin(UCobra, Turno.cobrado_por_id == UCobra.id)  # <-- requiere columna cobrado_por_id
-        .filter(
-            Turno.hora_inicio >= fecha_inicio_dt,
-            Turno.hora_fin != None,
-            Turno.hora_fin <= fecha_fin_dt,
-            Turno.estado == "cerrado",
+        .options(
+            joinedload(Turno.mesa),
+            selectinload(Turno.consumos).joinedload(Consumo.producto),
         )
+        .filter(*filtros_cerrados(fecha_inicio_dt, fecha_fin_dt, mesa_id))
     )
 
-    if mesa_id is not None:
-        query = query.filter(Turno.mesa_id == mesa_id)
-
     rows = query.order_by(Turno.hora_inicio.asc()).all()
 
-    turnos: list[ReporteTurno] = []
-    tot_tiempo = tot_prod = tot_desc = tot_serv = tot_final = 0.0
+    turnos = [_reporte_turno_dict(t, u_at, u_co) for (t, u_at, u_co) in rows]
 
-    for (t, u_at, u_co) in rows:
-        consumos = [
-            ReporteConsumo(
-                producto_nombre=c.producto.nombre,
-                cantidad=c.cantidad,
-                subtotal=c.subtotal,
-            )
-            for c in (t.consumos or [])
+    return respuesta_json({
+        "fecha_inicio": fecha_inicio,
+        "fecha_fin": fecha_fin,
+        "mesa_id": mesa_id,
+        "turnos": turnos,
+        "total_tiempo": sum((t["subtotal_tiempo"] for t in turnos), 0.0),
+        "total_productos": sum((t["subtotal_productos"] for t in turnos), 0.0),
+        "total_descuentos": sum((t["descuento"] for t in turnos), 0.0),
+        "total_servicios_extras": sum((t["servicios_extras"] for t in turnos), 0.0),
+        "total_general": sum((t["total_final"] for t in turnos), 0.0),
+    }, ReporteOut)
+
+
+# =======================
+# EXPORT EN STREAMING (NDJSON / CSV)
+# =======================
+EXPORT_YIELD_PER = 500  # filas que trae el cursor del servidor por vuelta
+EXPORT_FLUSH_CADA = 200  # turnos por bloque enviado al cliente
+
+CSV_COLUMNAS = [
+    "turno_id", "mesa", "atendido_por", "facturado_por",
+    "hora_inicio", "hora_fin", "tiempo_total_min",
+    "subtotal_tiempo", "subtotal_productos", "descuento",
+    "servicios_extras", "total_final", "consumos",
+]
+
+
+def _export_stmt(fecha_inicio_dt: datetime, fecha_fin_dt: datetime, mesa_id: int | None):
+    """
+    Una sola consulta plana: una fila por consumo (o una fila si el turno no tiene
+    consumos), ordenada por turno para poder agrupar mientras se lee del cursor.
+    """
+    UAtiende = aliased(User)
+    UCobra = aliased(User)
+
+    return (
+        select(
+            Turno.id,
+            Turno.mesa_id,
+            Mesa.nombre.label("mesa_nombre"),
+            UAtiende.username.label("atendido_por"),
+            UCobra.username.label("facturado_por"),
+            Turno.hora_inicio,
+            Turno.hora_fin,
+            Turno.subtotal_tiempo,
+            Turno.subtotal_productos,
+            Turno.descuento,
+            Turno.servicios_extras,
+            Turno.total_final,
+            Producto.nombre.label("producto_nombre"),
+            Consumo.cantidad.label("consumo_cantidad"),
+            Consumo.subtotal.label("consumo_subtotal"),
+        )
+        .select_from(Turno)
+        .outerjoin(Mesa, Turno.mesa_id == Mesa.id)
+        .outerjoin(UAtiende, Turno.atendido_por_id == UAtiende.id)
+        .outerjoin(UCobra, Turno.cobrado_por_id == UCobra.id)
+        .outerjoin(Consumo, Consumo.turno_id == Turno.id)
+        .outerjoin(Producto, Consumo.producto_id == Producto.id)
+        .where(*filtros_cerrados(fecha_inicio_dt, fecha_fin_dt, mesa_id))
+        .order_by(Turno.hora_inicio.asc(), Turno.id.asc(), Consumo.id.asc())
+        # cursor del lado del servidor: memoria constante sin importar el rango
+        .execution_options(yield_per=EXPORT_YIELD_PER)
+    )
+
+
+def _turnos_export(db: Session, stmt):
+    """
+    Agrupa las filas del cursor por turno y las devuelve de a una.
+    """
+    for _, filas in groupby(db.execute(stmt), key=lambda r: r.id):
+        filas = list(filas)
+        t = filas[0]
+
+        yield {
+            "turno_id": t.id,
+            "mesa": t.mesa_nombre or str(t.mesa_id),
+            "atendido_por": t.atendido_por,
+            "facturado_por": t.facturado_por,
+            "hora_inicio": t.hora_inicio,
+            "hora_fin": t.hora_fin,
+            "tiempo_total_min": int((t.hora_fin - t.hora_inicio).total_seconds() / 60),
+            "subtotal_tiempo": float(t.subtotal_tiempo or 0),
+            "subtotal_productos": float(t.subtotal_productos or 0),
+            "descuento": float(t.descuento or 0),
+            "servicios_extras": float(t.servicios_extras or 0),
+            "total_final": float(t.total_final or 0),
+            "consumos": [
+                {
+                    "producto_nombre": f.producto_nombre,
+                    "cantidad": f.consumo_cantidad,
+                    "subtotal": float(f.consumo_subtotal or 0),
+                }
+                for f in filas
+                if f.consumo_cantidad is not None
+            ],
+        }
+
+
+def _linea_ndjson(data: dict) -> str:
+    return json.dumps(data, default=json_default, ensure_ascii=False) + "\n"
+
+
+def _linea_csv(valores: list) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(valores)
+    return buffer.getvalue()
+
+
+def _fila_csv(turno: dict) -> list:
+    consumos = "; ".join(
+        f"{c['producto_nombre']} x{c['cantidad']}" for c in turno["consumos"]
+    )
+    return [
+        turno["turno_id"], turno["mesa"], turno["atendido_por"], turno["facturado_por"],
+        turno["hora_inicio"].isoformat(), turno["hora_fin"].isoformat(), turno["tiempo_total_min"],
+        turno["subtotal_tiempo"], turno["subtotal_productos"], turno["descuento"],
+        turno["servicios_extras"], turno["total_final"], consumos,
+    ]
+
+
+def _generar_export(formato: str, fecha_inicio: str, fecha_fin: str, mesa_id: int | None):
+    fecha_inicio_dt, fecha_fin_dt = rango_fechas(fecha_inicio, fecha_fin)
+
+    totales = {
+        "cantidad_turnos": 0,
+        "total_tiempo": 0.0,
+        "total_productos": 0.0,
+        "total_descuentos": 0.0,
+        "total_servicios_extras": 0.0,
+        "total_general": 0.0,
+    }
+
+    # sesión propia: vive lo mismo que el stream, no lo que dura el handler
+    db = SessionLocal(info={"statement_timeout_ms": settings.DB_STATEMENT_TIMEOUT_REPORTES_MS})
+    try:
+        bloque: list[str] = []
+        if formato == "csv":
+            bloque.append(_linea_csv(CSV_COLUMNAS))
+
+        for turno in _turnos_export(db, _export_stmt(fecha_inicio_dt, fecha_fin_dt, mesa_id)):
+            totales["cantidad_turnos"] += 1
+            totales["total_tiempo"] += turno["subtotal_tiempo"]
+            totales["total_productos"] += turno["subtotal_productos"]
+            totales["total_descuentos"] += turno["descuento"]
+            totales["total_servicios_extras"] += turno["servicios_extras"]
+            totales["total_general"] += turno["total_final"]
+
+            if formato == "csv":
+                bloque.append(_linea_csv(_fila_csv(turno)))
+            else:
+                bloque.append(_linea_ndjson({"tipo": "turno", **turno}))
+
+            if len(bloque) >= EXPORT_FLUSH_CADA:
+                yield "".join(bloque)
+                bloque = []
+
+        # registro final con los totales acumulados
+        if formato == "csv":
+            bloque.append(_linea_csv([
+                "TOTAL", totales["cantidad_turnos"], "", "", "", "", "",
+                totales["total_tiempo"], totales["total_productos"], totales["total_descuentos"],
+                totales["total_servicios_extras"], totales["total_general"], "",
+            ]))
+        else:
+            bloque.append(_linea_ndjson({
+                "tipo": "totales",
+                "fecha_inicio": fecha_inicio,
+                "fecha_fin": fecha_fin,
+                "mesa_id": mesa_id,
+                **totales,
+            }))
+        yield "".join(bloque)
+    finally:
+        db.close()
+
+
+@router.get("/export")
+def exportar_reporte(
+    fecha_inicio: str,
+    fecha_fin: str,
+    formato: str = Query(default="ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    mesa_id: int | None = Query(default=None),
+):
+    """
+    Igual que GET /reportes pero en streaming: memoria constante sin importar el rango.
+    NDJSON: una línea por turno y una última línea {"tipo": "totales", ...}.
+    CSV: una fila por turno y una última fila "TOTAL".
+    """
+    # validamos las fechas antes de empezar a responder
+    rango_fechas(fecha_inicio, fecha_fin)
+
+    if formato == "csv":
+        media_type = "text/csv; charset=utf-8"
+        nombre = f"reporte_{fecha_inicio}_{fecha_fin}.csv".replace("/", "-")
+    else:
+        media_type = "application/x-ndjson"
+        nombre = f"reporte_{fecha_inicio}_{fecha_fin}.ndjson".replace("/", "-")
+
+    return StreamingResponse(
+        _generar_export(formato, fecha_inicio, fecha_fin, mesa_id),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+    )
+
+
+# =======================
+# RESUMEN AGRUPADO (GROUP BY EN LA BASE DE DATOS)
+# =======================
+AGRUPACIONES = ("dia", "hora", "mesa", "atendido_por", "cobrado_por")
+
+
+def _grupos_por_hora(db: Session, filtros: list) -> list[ResumenGrupo]:
+    """
+    Totales por hora del día (0-23) de hora_fin. Es el único agrupamiento que
+    necesita leer la tabla turnos; el resto sale de resumen_diario.
+    """
+    hora = func.extract("hour", Turno.hora_fin)
+    stmt = (
+        select(hora.label("clave"), *columnas_totales())
+        .select_from(Turno)
+        .where(*filtros)
+        .group_by(hora)
+        .order_by(hora)
+    )
+    return [
+        ResumenGrupo(grupo=f"{int(r.clave):02d}:00", **fila_totales(r))
+        for r in db.execute(stmt).all()
+    ]
+
+
+def _grupos_diario(db: Session, agrupar: str, filtros: list) -> list[ResumenGrupo]:
+    """
+    Totales por dia | mesa | atendido_por | cobrado_por leyendo resumen_diario
+    (O(días) filas en lugar de O(turnos)).
+    """
+    if agrupar == "dia":
+        stmt = (
+            select(ResumenDiario.dia.label("clave"), *columnas_totales_diario())
+            .where(*filtros)
+            .group_by(ResumenDiario.dia)
+            .order_by(ResumenDiario.dia)
+        )
+        return [
+            ResumenGrupo(grupo=r.clave.isoformat(), **fila_totales(r))
+            for r in db.execute(stmt).all()
         ]
 
-        # mesa seguro
-        mesa_nombre = t.mesa.nombre if getattr(t, "mesa", None) else str(t.mesa_id)
-
-        atendido_por = user_label(u_at)
-        facturado_por = user_label(u_co)
-
-        turnos.append(
-            ReporteTurno(
-                mesa=mesa_nombre,
-                atendido_por=atendido_por,
-                facturado_por=facturado_por,  # <-- requiere que tu schema lo tenga
-                hora_inicio=t.hora_inicio,
-                hora_fin=t.hora_fin,
-                tiempo_total_min=int((t.hora_fin - t.hora_inicio).total_seconds() / 60),
-                subtotal_tiempo=float(t.subtotal_tiempo or 0),
-                subtotal_productos=float(t.subtotal_productos or 0),
-                descuento=float(t.descuento or 0),
-                servicios_extras=float(getattr(t, "servicios_extras", 0) or 0),
-                total_final=float(t.total_final or 0),
-                consumos=consumos,
+    if agrupar == "mesa":
+        grupo_id = ResumenDiario.mesa_id
+        nombre = Mesa.nombre
+        join = (Mesa, grupo_id == Mesa.id)
+    else:
+        if agrupar == "atendido_por":
+            grupo_id = ResumenDiario.atendido_por_id
+        else:
+            grupo_id = ResumenDiario.cobrado_por_id
+        nombre = User.username
+        join = (User, grupo_id == User.id)
+
+    stmt = (
+        select(grupo_id.label("grupo_id"), nombre.label("nombre"), *columnas_totales_diario())
+        .select_from(ResumenDiario)
+        .outerjoin(*join)
+        .where(*filtros)
+        .group_by(grupo_id, nombre)
+        .order_by(grupo_id)
+    )
+
+    grupos = []
+    for r in db.execute(stmt).all():
+        # 0 = turno sin mesa/usuario asignado
+        gid = r.grupo_id or None
+        grupos.append(
+            ResumenGrupo(
+                grupo=r.nombre or (str(gid) if gid is not None else "sin asignar"),
+                grupo_id=gid,
+                **fila_totales(r),
             )
         )
+    return grupos
+
+
+def _resumen_periodo(
+    db: Session, agrupar: str, fecha_inicio_dt: datetime, fecha_fin_dt: datetime, mesa_id: int | None
+) -> ResumenPeriodo:
+    if agrupar == "hora":
+        filtros = filtros_cerrados(fecha_inicio_dt, fecha_fin_dt, mesa_id)
+        grupos = _grupos_por_hora(db, filtros)
+        total = totales_turnos(db, *filtros)
+    else:
+        filtros = filtros_diario(fecha_inicio_dt.date(), fecha_fin_dt.date(), mesa_id)
+        grupos = _grupos_diario(db, agrupar, filtros)
+        total = fila_totales(db.execute(select(*columnas_totales_diario()).where(*filtros)).one())
 
-        tot_tiempo += float(t.subtotal_tiempo or 0)
-        tot_prod += float(t.subtotal_productos or 0)
-        tot_desc += float(t.descuento or 0)
-        tot_serv += float(getattr(t, "servicios_extras", 0) or 0)
-        tot_final += float(t.total_final or 0)
-
-    return ReporteOut(
-        fecha_inicio=fecha_inicio,
-        fecha_fin=fecha_fin,
-        mesa_id=mesa_id,
-        turnos=turnos,
-        total_tiempo=tot_tiempo,
-        total_productos=tot_prod,
-        total_descuentos=tot_desc,
-        total_servicios_extras=tot_serv,
-        total_general=tot_final,
+    return ResumenPeriodo(
+        fecha_inicio=fecha_inicio_dt,
+        fecha_fin=fecha_fin_dt,
+        grupos=grupos,
+        total=ResumenGrupo(grupo="TOTAL", **total),
     )
+
+
+@router.get("/resumen", response_model=ResumenOut)
+def resumen_reporte(
+    fecha_inicio: str,
+    fecha_fin: str,
+    agrupar: str = Query(default="dia", pattern="^(" + "|".join(AGRUPACIONES) + ")$"),
+    mesa_id: int | None = Query(default=None),
+    comparar: bool = Query(default=False),
+    db: Session = Depends(get_db_reportes),
+):
+    """
+    Totales agrupados por dia | hora | mesa | atendido_por | cobrado_por.
+    Salvo "hora", se leen de resumen_diario (el día es la fecha de hora_fin).
+    Con comparar=true también devuelve el período anterior de la misma duración.
+    """
+    fecha_inicio_dt, fecha_fin_dt = rango_fechas(fecha_inicio, fecha_fin)
+
+    actual = _resumen_periodo(db, agrupar, fecha_inicio_dt, fecha_fin_dt, mesa_id)
+
+    anterior = None
+    if comparar:
+        duracion = (fecha_fin_dt - fecha_inicio_dt) + timedelta(microseconds=1)
+        anterior = _resumen_periodo(
+            db,
+            agrupar,
+            fecha_inicio_dt - duracion,
+            fecha_inicio_dt - timedelta(microseconds=1),
+            mesa_id,
+        )
+
+    return ResumenOut(agrupar=agrupar, mesa_id=mesa_id, actual=actual, anterior=anterior)
@@ -1,20 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 from datetime import datetime
 import pytz
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, get_db_pos, get_async_db
 from app.models.turno import Turno
 from app.models.consumo import Consumo
 from app.models.mesa import Mesa
 from app.models.producto import Producto
 
 from app.schemas.turno_schema import (
-    TurnoCreate, TurnoOut, AgregarProducto, CerrarTurno, TransferirTurno
+    TurnoCreate, TurnoOut, AgregarProducto, AgregarProductosLote, CerrarTurno, TransferirTurno
 )
 
 from app.deps import get_current_user
 from app.models.user import User
+from app.utils.loaders import load_turnos_full, load_turno_full, load_turnos_full_async
+from app.utils.resumen_diario import registrar_turno_cerrado
+from app.utils.eventos import bus
+from app.utils.versiones import versiones
+from app.utils.catalogo import catalogo
+from app.utils.respuestas import respuesta_json
+from app.utils.idempotencia import idempotente
+from app.utils.stock import mover_stock, sumar_subtotal_productos
+from app.utils.facturacion import minutos_efectivos, cobro_tiempo, total_final, liquidar_turnos
 
 
 router = APIRouter(prefix="/turnos", tags=["Turnos"])
@@ -39,11 +51,7 @@ def _segundos_pausa_total(turno: Turno, ahora: datetime) -> int:
 
 
 def _minutos_efectivos(turno: Turno, ahora: datetime, inicio: datetime | None = None) -> float:
-    inicio_real = inicio or turno.hora_inicio
-    total_seg = int((ahora - inicio_real).total_seconds())
-    pausa_seg = _segundos_pausa_total(turno, ahora)
-    efectivos = max(0, total_seg - pausa_seg)
-    return efectivos / 60
+    return minutos_efectivos(inicio or turno.hora_inicio, ahora, turno.pausa_acumulada_seg, turno.pausa_inicio)
 
 def turno_to_dict(turno: Turno):
     consumos = [{
@@ -51,7 +59,7 @@ def turno_to_dict(turno: Turno):
         "producto_id": c.producto_id,
         "producto_nombre": c.producto.nombre,
         "cantidad": c.cantidad,
-        "subtotal": c.subtotal
+        "subtotal": float(c.subtotal)
     } for c in turno.consumos]
 
     ahora = _now_bo()
@@ -63,12 +71,12 @@ def turno_to_dict(turno: Turno):
         "mesa_id": turno.mesa_id,
         "hora_inicio": turno.hora_inicio,
         "hora_fin": turno.hora_fin,
-        "tarifa_hora": turno.tarifa_hora,
-        "subtotal_tiempo": turno.subtotal_tiempo,
-        "subtotal_productos": turno.subtotal_productos,
-        "servicios_extras": turno.servicios_extras,
-        "descuento": turno.descuento,
-        "total_final": turno.total_final,
+        "tarifa_hora": float(turno.tarifa_hora),
+        "subtotal_tiempo": float(turno.subtotal_tiempo or 0),
+        "subtotal_productos": float(turno.subtotal_productos or 0),
+        "servicios_extras": float(turno.servicios_extras or 0),
+        "descuento": float(turno.descuento or 0),
+        "total_final": float(turno.total_final or 0),
         "estado": turno.estado,
         "pausa_inicio": turno.pausa_inicio,
         "pausa_acumulada_seg": int(turno.pausa_acumulada_seg or 0),
@@ -77,22 +85,101 @@ def turno_to_dict(turno: Turno):
         "pausa_total_seg": int(pausa_total),          # acumulada + pausa actual si está pausado
         "minutos_efectivos": float(minutos_ef),       # minutos jugados sin contar pausa
 
+        "version": turno.version,  # para If-Match en pausar/reanudar/cerrar/transferir
+
         "consumos": consumos,
     }
 
 
 
-@router.get("/activos")
-def turnos_activos(db: Session = Depends(get_db)):
-    turnos = db.query(Turno).filter(Turno.estado.in_(["abierto", "pausado"])).all()
-    return [turno_to_dict(t) for t in turnos]
+def _mesa_diff(mesa_id: int, turno: Turno | None = None) -> dict:
+    """
+    Cambio de una mesa para /ws/floor (mismos campos que GET /mesas, sin nombre/tarifa/imagen).
+    """
+    activo = turno if turno is not None and turno.estado in ("abierto", "pausado") else None
+    return {
+        "id": mesa_id,
+        "estado": "ocupada" if activo else "libre",
+        "hora_inicio": activo.hora_inicio if activo else None,
+        "turno_activo": activo.id if activo else None,
+        "turno_estado": activo.estado if activo else None,
+        "pausa_inicio": activo.pausa_inicio if activo else None,
+        "pausa_acumulada_seg": int(activo.pausa_acumulada_seg or 0) if activo else 0,
+    }
+
+
+# =======================
+# CONCURRENCIA OPTIMISTA (version + If-Match)
+# =======================
+def _respuesta_turno(turno: Turno):
+    resp = respuesta_json(turno_to_dict(turno), TurnoOut)
+    resp.headers["ETag"] = f'"{turno.version}"'
+    return resp
+
+
+def _version_if_match(request: Request) -> int | None:
+    valor = (request.headers.get("if-match") or "").strip()
+    if not valor or valor == "*":
+        return None
+    try:
+        return int(valor.removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match inválido")
+
+
+def _conflicto(db: Session, turno_id: int, status_code: int = 409):
+    """
+    Otra tablet cambió el turno: se devuelve su estado actual para reintentar sobre él.
+    """
+    db.rollback()
+    actual = load_turno_full(db, turno_id)
+    resp = respuesta_json({
+        "detail": "El turno fue modificado por otra operación, reintente",
+        "turno": turno_to_dict(actual) if actual else None,
+    }, status_code=status_code)
+    if actual:
+        resp.headers["ETag"] = f'"{actual.version}"'
+    return resp
+
+
+def _precondicion(request: Request, db: Session, turno: Turno):
+    """
+    If-Match con una versión vieja -> 412 con el estado actual (sin tocar nada).
+    """
+    esperada = _version_if_match(request)
+    if esperada is not None and esperada != turno.version:
+        return _conflicto(db, turno.id, status_code=412)
+    return None
+
+
+def _activos_dicts(turnos: list[Turno], en_vivo: bool) -> list[dict]:
+    data = [turno_to_dict(t) for t in turnos]
+    if en_vivo:
+        # lo mismo que /preview, para todas las mesas en un solo cálculo
+        for d, (subtotal, total) in zip(data, liquidar_turnos(turnos, _now_bo())):
+            d["subtotal_tiempo"] = subtotal
+            d["total_final"] = total
+    return data
+
+
+def turnos_activos(en_vivo: bool = False, db: Session = Depends(get_db)):
+    turnos = load_turnos_full(db, Turno.estado.in_(["abierto", "pausado"]))
+    return respuesta_json(_activos_dicts(turnos, en_vivo), list[TurnoOut])
+
+
+async def turnos_activos_async(en_vivo: bool = False, db: AsyncSession = Depends(get_async_db)):
+    turnos = await load_turnos_full_async(db, Turno.estado.in_(["abierto", "pausado"]))
+    return respuesta_json(_activos_dicts(turnos, en_vivo), list[TurnoOut])
+
+
+router.get("/activos", response_model=list[TurnoOut])(turnos_activos_async if settings.DB_ASYNC_LECTURAS else turnos_activos)
 
 
 # =======================
 # INICIAR TURNO
 # =======================
-@router.post("/iniciar", response_model=TurnoOut)
-def iniciar_turno(data: TurnoCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@router.post("/iniciar", response_model=TurnoOut, dependencies=[Depends(idempotente)])
+def iniciar_turno(data: TurnoCreate, db: Session = Depends(get_db_pos), current_user: User = Depends(get_current_user)):
     mesa = db.query(Mesa).filter(Mesa.id == data.mesa_id).first()
     if not mesa:
         raise HTTPException(404, "Mesa no encontrada")
@@ -115,55 +202,128 @@ def iniciar_turno(data: TurnoCreate, db: Session = Depends(get_db), current_user
     db.add(turno)
     mesa.estado = "ocupada"
     mesa.hora_inicio = turno.hora_inicio
-    db.commit()
-    db.refresh(turno)
+    try:
+        db.commit()
+    except StaleDataError:
+        # otra tablet abrió/cerró la mesa entre la lectura y el commit
+        db.rollback()
+        raise HTTPException(409, "La mesa fue modificada por otra operación, reintente")
+    versiones.bump("mesas")
 
-    return turno_to_dict(turno)
+    turno = load_turno_full(db, turno.id)
+    bus.publicar({"tipo": "turno_iniciado", "mesa": _mesa_diff(turno.mesa_id, turno)})
+    return _respuesta_turno(turno)
 
 
 # =======================
 # AGREGAR PRODUCTO
 # =======================
-@router.post("/{turno_id}/agregar-producto", response_model=TurnoOut)
-def agregar_producto(turno_id: int, data: AgregarProducto, db: Session = Depends(get_db)):
-    turno = db.query(Turno).filter(Turno.id == turno_id, Turno.estado.in_(["abierto", "pausado"])).first()
-    if not turno:
-        raise HTTPException(status_code=404, detail="Turno no encontrado o ya cerrado")
-
-    producto = db.query(Producto).filter(Producto.id == data.producto_id).first()
-    if not producto:
-        raise HTTPException(status_code=404, detail="Producto no encontrado")
-
-    # ✅ stock correcto
-    if producto.cantidad < data.cantidad:
-        raise HTTPException(status_code=400, detail="Stock insuficiente")
+@router.post("/{turno_id}/agregar-producto", response_model=TurnoOut, dependencies=[Depends(idempotente)])
+def agregar_producto(turno_id: int, data: AgregarProducto, db: Session = Depends(get_db_pos)):
+    # ✅ stock y subtotal se actualizan en la base (UPDATE condicional), sin carreras entre tablets.
+    # Orden de bloqueo: producto -> turno (igual que consumos:batch)
+    producto = mover_stock(db, data.producto_id, -data.cantidad)
 
     # ✅ precio correcto (venta)
     subtotal = producto.precio_venta * data.cantidad
+    sumar_subtotal_productos(db, turno_id, subtotal)
 
-    consumo = Consumo(
-        turno_id=turno.id,
-        producto_id=producto.id,
+    db.add(Consumo(
+        turno_id=turno_id,
+        producto_id=data.producto_id,
         cantidad=data.cantidad,
         subtotal=subtotal
+    ))
+    db.commit()
+    versiones.bump("productos")
+    catalogo.fijar_stock(data.producto_id, producto.cantidad, producto.orden)
+
+    turno = load_turno_full(db, turno_id)
+    bus.publicar({
+        "tipo": "consumo_agregado",
+        "turno_id": turno.id,
+        "mesa_id": turno.mesa_id,
+        "subtotal_productos": turno.subtotal_productos,
+    })
+    return _respuesta_turno(turno)
+
+
+# =======================
+# AGREGAR VARIOS PRODUCTOS (una ronda)
+# =======================
+@router.post("/{turno_id}/consumos:batch", response_model=TurnoOut, dependencies=[Depends(idempotente)])
+def agregar_productos_lote(turno_id: int, data: AgregarProductosLote, db: Session = Depends(get_db_pos)):
+    # cantidad total por producto (el mismo producto puede venir en varias líneas)
+    pedidos: dict[int, int] = {}
+    for linea in data.consumos:
+        pedidos[linea.producto_id] = pedidos.get(linea.producto_id, 0) + linea.cantidad
+
+    # una sola consulta; filas bloqueadas siempre en orden de id (y antes que el turno,
+    # igual que agregar-producto) para no cruzarse con otra caja
+    productos = {
+        p.id: p
+        for p in db.query(Producto)
+        .filter(Producto.id.in_(pedidos))
+        .order_by(Producto.id)
+        .with_for_update()
+        .all()
+    }
+
+    faltantes = [pid for pid in pedidos if pid not in productos]
+    if faltantes:
+        raise HTTPException(status_code=404, detail=f"Producto no encontrado: {faltantes}")
+
+    sin_stock = [productos[pid].nombre for pid, cant in pedidos.items() if productos[pid].cantidad < cant]
+    if sin_stock:
+        raise HTTPException(status_code=400, detail=f"Stock insuficiente: {', '.join(sin_stock)}")
+
+    turno = (
+        db.query(Turno)
+        .filter(Turno.id == turno_id, Turno.estado.in_(["abierto", "pausado"]))
+        .with_for_update()
+        .first()
     )
+    if not turno:
+        raise HTTPException(status_code=404, detail="Turno no encontrado o ya cerrado")
 
-    # ✅ descontar cantidad
-    producto.cantidad -= data.cantidad
-    turno.subtotal_productos += subtotal
+    total = 0.0
+    for linea in data.consumos:
+        subtotal = productos[linea.producto_id].precio_venta * linea.cantidad
+        total += subtotal
+        db.add(Consumo(
+            turno_id=turno.id,
+            producto_id=linea.producto_id,
+            cantidad=linea.cantidad,
+            subtotal=subtotal,
+        ))
+
+    stock: dict[int, tuple[int, int]] = {}
+    for pid, cant in pedidos.items():
+        productos[pid].cantidad -= cant
+        # filas bloqueadas con FOR UPDATE: el orden vale igual que en mover_stock
+        stock[pid] = (productos[pid].cantidad, catalogo.orden_stock())
+    turno.subtotal_productos = (turno.subtotal_productos or 0) + total
 
-    db.add(consumo)
     db.commit()
-    db.refresh(turno)
-
-    return turno_to_dict(turno)
+    versiones.bump("productos")
+    for pid, (cantidad, orden) in stock.items():
+        catalogo.fijar_stock(pid, cantidad, orden)
+
+    turno = load_turno_full(db, turno.id)
+    bus.publicar({
+        "tipo": "consumo_agregado",
+        "turno_id": turno.id,
+        "mesa_id": turno.mesa_id,
+        "subtotal_productos": turno.subtotal_productos,
+    })
+    return _respuesta_turno(turno)
 
 # =======================
 # PREVIEW ANTES DE CERRAR
 # =======================
 @router.get("/{turno_id}/preview", response_model=TurnoOut)
 def preview(turno_id: int, db: Session = Depends(get_db)):
-    turno = db.query(Turno).filter(Turno.id == turno_id).first()
+    turno = load_turno_full(db, turno_id)
     if not turno:
         raise HTTPException(404, "Turno no encontrado")
 
@@ -187,30 +347,24 @@ def preview(turno_id: int, db: Session = Depends(get_db)):
     # =============================
     # Calcular subtotal tiempo
     # =============================
-    if minutos <= 30:
-        subtotal = turno.tarifa_hora / 2
-    else:
-        horas_completas = int(minutos // 60)
-        resto = minutos % 60
-
-        subtotal = horas_completas * turno.tarifa_hora
-        subtotal += turno.tarifa_hora if resto >= 31 else turno.tarifa_hora / 2
+    subtotal = cobro_tiempo(minutos, turno.tarifa_hora)
 
     turno.subtotal_tiempo = subtotal
-    turno.total_final = subtotal + turno.subtotal_productos + turno.servicios_extras - turno.descuento
+    turno.total_final = total_final(subtotal, turno.subtotal_productos, turno.servicios_extras, turno.descuento)
 
-    return turno_to_dict(turno)
+    return _respuesta_turno(turno)
 
 
 
 # =======================
 # CERRAR TURNO
 # =======================
-@router.patch("/{turno_id}/cerrar", response_model=TurnoOut)
+@router.patch("/{turno_id}/cerrar", response_model=TurnoOut, dependencies=[Depends(idempotente)])
 def cerrar_turno(
     turno_id: int,
     data: CerrarTurno,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_db_pos),
     current_user: User = Depends(get_current_user),  # ✅ NUEVO
 ):
     turno = db.query(Turno).filter(
@@ -220,6 +374,10 @@ def cerrar_turno(
     if not turno:
         raise HTTPException(404, "Turno no encontrado o ya cerrado")
 
+    conflicto = _precondicion(request, db, turno)
+    if conflicto:
+        return conflicto
+
     turno.hora_fin = _now_bo()
 
     if turno.pausa_inicio:
@@ -228,21 +386,13 @@ def cerrar_turno(
         turno.pausa_inicio = None
 
     minutos = _minutos_efectivos(turno, turno.hora_fin)
-
-    if minutos <= 30:
-        subtotal = (turno.tarifa_hora / 2)
-    else:
-        horas_completas = int(minutos // 60)
-        resto = minutos % 60
-
-        subtotal = horas_completas * turno.tarifa_hora
-        subtotal += turno.tarifa_hora if resto >= 31 else turno.tarifa_hora / 2
+    subtotal = cobro_tiempo(minutos, turno.tarifa_hora)
 
     turno.subtotal_tiempo = subtotal
     turno.descuento = data.descuento
     turno.servicios_extras = data.servicios_extras
 
-    turno.total_final = subtotal + turno.subtotal_productos + turno.servicios_extras - turno.descuento
+    turno.total_final = total_final(subtotal, turno.subtotal_productos, turno.servicios_extras, turno.descuento)
     turno.estado = "cerrado"
 
     # ✅ NUEVO: guardamos quién cerró/cobró
@@ -252,10 +402,19 @@ def cerrar_turno(
     mesa.estado = "libre"
     mesa.hora_inicio = None
 
-    db.commit()
-    db.refresh(turno)
+    # si entró un consumo (o una pausa) desde que leímos el turno, su versión cambió:
+    # el UPDATE no encuentra la fila y se responde 409 en vez de cerrar con un total viejo
+    try:
+        # mismo commit que el cierre: el resumen diario nunca queda desfasado
+        registrar_turno_cerrado(db, turno)
+        db.commit()
+    except StaleDataError:
+        return _conflicto(db, turno_id)
+    versiones.bump("mesas")
 
-    return turno_to_dict(turno)
+    turno = load_turno_full(db, turno.id)
+    bus.publicar({"tipo": "turno_cerrado", "turno_id": turno.id, "mesa": _mesa_diff(turno.mesa_id)})
+    return _respuesta_turno(turno)
 
 
 
@@ -266,7 +425,8 @@ def cerrar_turno(
 @router.patch("/{turno_id}/pausar", response_model=TurnoOut)
 def pausar_turno(
     turno_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_db_pos),
 ):
     turno = db.query(Turno).filter(
         Turno.id == turno_id,
@@ -275,17 +435,33 @@ def pausar_turno(
     if not turno:
         raise HTTPException(404, "Turno no encontrado o ya cerrado")
 
+    conflicto = _precondicion(request, db, turno)
+    if conflicto:
+        return conflicto
+
     # idempotente
     if turno.pausa_inicio:
         turno.estado = "pausado"  # por si estaba desincronizado
-        return turno_to_dict(turno)
+        try:
+            db.commit()
+        except StaleDataError:
+            return _conflicto(db, turno_id)
+        versiones.bump("mesas")
+        turno = load_turno_full(db, turno.id)
+        bus.publicar({"tipo": "turno_pausado", "mesa": _mesa_diff(turno.mesa_id, turno)})
+        return _respuesta_turno(turno)
 
     turno.estado = "pausado"
     turno.pausa_inicio = _now_bo()
 
-    db.commit()
-    db.refresh(turno)
-    return turno_to_dict(turno)
+    try:
+        db.commit()
+    except StaleDataError:
+        return _conflicto(db, turno_id)
+    versiones.bump("mesas")
+    turno = load_turno_full(db, turno.id)
+    bus.publicar({"tipo": "turno_pausado", "mesa": _mesa_diff(turno.mesa_id, turno)})
+    return _respuesta_turno(turno)
 
 
 # =======================
@@ -294,7 +470,8 @@ def pausar_turno(
 @router.patch("/{turno_id}/reanudar", response_model=TurnoOut)
 def reanudar_turno(
     turno_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_db_pos),
 ):
     turno = db.query(Turno).filter(
         Turno.id == turno_id,
@@ -303,11 +480,20 @@ def reanudar_turno(
     if not turno:
         raise HTTPException(404, "Turno no encontrado o ya cerrado")
 
+    conflicto = _precondicion(request, db, turno)
+    if conflicto:
+        return conflicto
+
     if not turno.pausa_inicio:
         turno.estado = "abierto"
-        db.commit()
-        db.refresh(turno)
-        return turno_to_dict(turno)
+        try:
+            db.commit()
+        except StaleDataError:
+            return _conflicto(db, turno_id)
+        versiones.bump("mesas")
+        turno = load_turno_full(db, turno.id)
+        bus.publicar({"tipo": "turno_reanudado", "mesa": _mesa_diff(turno.mesa_id, turno)})
+        return _respuesta_turno(turno)
 
     ahora = _now_bo()
     delta = int((ahora - turno.pausa_inicio).total_seconds())
@@ -315,9 +501,14 @@ def reanudar_turno(
     turno.pausa_inicio = None
     turno.estado = "abierto"
 
-    db.commit()
-    db.refresh(turno)
-    return turno_to_dict(turno)
+    try:
+        db.commit()
+    except StaleDataError:
+        return _conflicto(db, turno_id)
+    versiones.bump("mesas")
+    turno = load_turno_full(db, turno.id)
+    bus.publicar({"tipo": "turno_reanudado", "mesa": _mesa_diff(turno.mesa_id, turno)})
+    return _respuesta_turno(turno)
 
 
 
@@ -328,7 +519,8 @@ def reanudar_turno(
 def transferir_turno(
     mesa_origen_id: int,
     data: TransferirTurno,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: Session = Depends(get_db_pos)
 ):
     mesa_destino_id = data.mesa_destino_id
 
@@ -344,6 +536,11 @@ def transferir_turno(
     if not turno:
         raise HTTPException(status_code=404, detail="No hay turno activo (abierto/pausado) en la mesa origen")
 
+    conflicto = _precondicion(request, db, turno)
+    if conflicto:
+        return conflicto
+    turno_id = turno.id
+
     # 2) Validar mesas
     mesa_origen = db.query(Mesa).filter(Mesa.id == mesa_origen_id).first()
     if not mesa_origen:
@@ -375,14 +572,25 @@ def transferir_turno(
         mesa_destino.hora_inicio = turno.hora_inicio  # mantiene el inicio real (pausas se descuentan en backend)
 
         db.commit()
+        versiones.bump("mesas")
         db.refresh(turno)
 
+        bus.publicar({
+            "tipo": "turno_transferido",
+            "turno_id": turno.id,
+            "mesas": [_mesa_diff(mesa_origen_id), _mesa_diff(mesa_destino_id, turno)],
+        })
+
         return {
             "mensaje": "Turno transferido",
             "turno_id": turno.id,
             "mesa_origen_id": mesa_origen_id,
             "mesa_destino_id": mesa_destino_id,
+            "version": turno.version,
         }
+    except StaleDataError:
+        # el turno o alguna de las mesas cambió (p.ej. otra transferencia a la misma mesa destino)
+        return _conflicto(db, turno_id)
     except Exception:
         db.rollback()
         raise HTTPException(status_code=500, detail="Error al transferir el turno")
@@ -1,14 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user_schema import UserCreate, UserOut, UserUpdate
-from passlib.context import CryptContext
-from app.deps import get_current_user
+from app.utils.security import hash_password
+from app.utils.versiones import versiones, no_modificado
+from app.utils.paginacion import PaginaQuery, codificar_cursor, decodificar_cursor, poner_siguiente
+from app.deps import get_current_user, require_admin, invalidar_usuario, usuarios_cache
 
 router = APIRouter(prefix="/users", tags=["Usuarios"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 @router.post("/", response_model=UserOut)
 def create_user(data: UserCreate, db: Session = Depends(get_db)):
@@ -18,24 +19,55 @@ def create_user(data: UserCreate, db: Session = Depends(get_db)):
     if exists:
         raise HTTPException(status_code=409, detail="Ese usuario ya existe")
 
-    hashed = pwd_context.hash(data.password)
+    hashed = hash_password(data.password)
     new_user = User(username=username, password_hash=hashed, rol=data.rol)
     db.add(new_user)
     db.commit()
+    versiones.bump("users")
     db.refresh(new_user)
     return new_user
 
 
 
 @router.get("/", response_model=list[UserOut])
-def get_users(db: Session = Depends(get_db)):
-    return db.query(User).all()
+def get_users(
+    request: Request,
+    response: Response,
+    username: str | None = None,
+    cursor: str | None = None,
+    limit: int = PaginaQuery,
+    db: Session = Depends(get_db),
+):
+    no_mod = no_modificado(request, response, "users")
+    if no_mod:
+        return no_mod
+
+    query = db.query(User)
+    if username:
+        # prefijo (LIKE 'x%'): usa ix_users_username_prefijo
+        query = query.filter(User.username.startswith(username.strip(), autoescape=True))
+    if cursor:
+        (ultimo_id,) = decodificar_cursor(cursor, int)
+        query = query.filter(User.id > ultimo_id)
+
+    query = query.order_by(User.id)
+
+    users = query.limit(limit + 1).all()
+    if len(users) > limit:
+        users = users[:limit]
+        poner_siguiente(response, codificar_cursor(users[-1].id))
+    return users
 
 @router.get("/me", response_model=UserOut)
 def obtener_usuario_logeado(user = Depends(get_current_user)):
     return user
 
 
+@router.get("/cache/stats")
+def estadisticas_cache_usuarios(admin = Depends(require_admin)):
+    return usuarios_cache.stats()
+
+
 @router.put("/{user_id}", response_model=UserOut)
 def update_user(
     user_id: int,
@@ -65,8 +97,12 @@ def update_user(
         new_password = data.password.strip()
         if new_password == "":
             raise HTTPException(status_code=400, detail="La contraseña no puede estar vacía")
-        user.password_hash = pwd_context.hash(new_password)
+        user.password_hash = hash_password(new_password)
 
     db.commit()
+    versiones.bump("users")
     db.refresh(user)
+
+    # el cache de get_current_user no debe seguir sirviendo los datos viejos
+    invalidar_usuario(user.id)
     return user
\ No newline at end of file
@@ -32,6 +32,7 @@ class MesaOut(BaseModel):
     pausa_acumulada_seg: int = 0
 
     imagen: str | None = None
+    version: int = 1
 
     class Config:
         from_attributes = True
@@ -30,6 +30,7 @@ class ProductoStockDelta(BaseModel):
 
 class ProductoOut(ProductoBase):
     id: int
+    imagen_thumb: str | None = None
     categoria: CategoriaOut | None = None
 
     class Config:
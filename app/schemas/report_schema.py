@@ -32,3 +32,26 @@ class ReporteOut(BaseModel):
     total_descuentos: float
     total_servicios_extras: float
     total_general: float
+
+
+class ResumenGrupo(BaseModel):
+    grupo: str
+    grupo_id: int | None = None
+    cantidad_turnos: int
+    total_tiempo: float
+    total_productos: float
+    total_descuentos: float
+    total_servicios_extras: float
+    total_general: float
+
+class ResumenPeriodo(BaseModel):
+    fecha_inicio: datetime
+    fecha_fin: datetime
+    grupos: List[ResumenGrupo]
+    total: ResumenGrupo
+
+class ResumenOut(BaseModel):
+    agrupar: str
+    mesa_id: int | None
+    actual: ResumenPeriodo
+    anterior: ResumenPeriodo | None = None
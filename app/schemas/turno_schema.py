@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import List
 
@@ -27,6 +27,14 @@ class AgregarProducto(BaseModel):
     cantidad: int
 
 
+class ConsumoLinea(AgregarProducto):
+    cantidad: int = Field(gt=0)
+
+
+class AgregarProductosLote(BaseModel):
+    consumos: List[ConsumoLinea] = Field(min_length=1, max_length=100)
+
+
 class CerrarTurno(BaseModel):
     descuento: float = 0
     servicios_extras: float = 0  # 👈 NUEVO
@@ -51,6 +59,9 @@ class TurnoOut(BaseModel):
 
     pausa_inicio: datetime | None = None
     pausa_acumulada_seg: int = 0
+    pausa_total_seg: int = 0
+    minutos_efectivos: float = 0
+    version: int = 1
 
     consumos: List[ConsumoDetalle] = []
 
@@ -0,0 +1,283 @@
+import itertools
+import json
+import threading
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.producto import Producto
+from app.models.categoria import Categoria
+from app.utils.uploads import variante_url
+
+
+class CategoriaCache:
+    __slots__ = ("id", "nombre")
+
+    def __init__(self, id: int, nombre: str):
+        self.id = id
+        self.nombre = nombre
+
+
+class ProductoCache:
+    __slots__ = (
+        "id", "nombre", "precio_compra", "precio_venta",
+        "cantidad", "imagen", "categoria_id", "json",
+    )
+
+    def __init__(self, p: Producto):
+        self.id = p.id
+        self.nombre = p.nombre
+        self.precio_compra = p.precio_compra
+        self.precio_venta = p.precio_venta
+        self.cantidad = p.cantidad
+        self.imagen = p.imagen
+        self.categoria_id = p.categoria_id
+        self.json = b""  # este producto ya serializado (mismo formato que ProductoOut)
+
+
+def _dumps(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class Catalogo:
+    """
+    Productos y categorías en memoria, con el JSON de cada uno ya armado.
+    GET /productos y GET /categorias responden sin tocar la base ni pydantic.
+
+    Los endpoints que escriben actualizan el cache después del commit
+    (write-through). El stock se escribe con el valor absoluto que devolvió
+    la base, no por delta (ver fijar_stock).
+    Una carga que se cruzó con una escritura no se instala (ver _generacion).
+    Igual que versiones: pensado para un solo proceso.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._productos: dict[int, ProductoCache] | None = None
+        self._categorias: dict[int, CategoriaCache] | None = None
+        self._json_productos: bytes | None = None
+        self._json_categorias: bytes | None = None
+        self._generacion = 0
+        # stock: último orden aplicado por producto (sobrevive a invalidar/cargar)
+        self._ordenes_stock = itertools.count(1)
+        self._ultimo_orden_stock: dict[int, int] = {}
+
+    # =======================
+    # CARGA
+    # =======================
+    @property
+    def cargado(self) -> bool:
+        return self._productos is not None
+
+    def _instalar(self, generacion: int, productos: list[Producto], categorias: list[Categoria]):
+        with self._lock:
+            if generacion != self._generacion:
+                return
+            self._categorias = {c.id: CategoriaCache(c.id, c.nombre) for c in categorias}
+            self._productos = {}
+            for p in productos:
+                item = ProductoCache(p)
+                item.json = self._serializar(item)
+                self._productos[p.id] = item
+            self._json_productos = None
+            self._json_categorias = None
+
+    def cargar(self, db: Session):
+        generacion = self._generacion
+        productos = db.scalars(select(Producto).order_by(Producto.id)).all()
+        categorias = db.scalars(select(Categoria)).all()
+        self._instalar(generacion, productos, categorias)
+
+    async def cargar_async(self, db: AsyncSession):
+        generacion = self._generacion
+        productos = (await db.scalars(select(Producto).order_by(Producto.id))).all()
+        categorias = (await db.scalars(select(Categoria))).all()
+        self._instalar(generacion, productos, categorias)
+
+    def invalidar(self):
+        with self._lock:
+            self._generacion += 1
+            self._productos = None
+            self._categorias = None
+            self._json_productos = None
+            self._json_categorias = None
+
+    # =======================
+    # LECTURA
+    # =======================
+    def _serializar(self, p: ProductoCache) -> bytes:
+        cat = self._categorias.get(p.categoria_id) if p.categoria_id is not None else None
+        return _dumps({
+            "nombre": p.nombre,
+            "precio_compra": p.precio_compra,
+            "precio_venta": p.precio_venta,
+            "cantidad": p.cantidad,
+            "imagen": p.imagen,
+            "categoria_id": p.categoria_id,
+            "id": p.id,
+            "imagen_thumb": variante_url(p.imagen, "thumb"),
+            "categoria": {"nombre": cat.nombre, "id": cat.id} if cat else None,
+        })
+
+    def productos_json(self) -> bytes | None:
+        with self._lock:
+            if self._productos is None:
+                return None
+            if self._json_productos is None:
+                self._json_productos = b"[" + b",".join(
+                    p.json for p in sorted(self._productos.values(), key=lambda p: p.id)
+                ) + b"]"
+            return self._json_productos
+
+    def productos_pagina(
+        self,
+        categoria_id: int | None = None,
+        nombre: str | None = None,
+        despues_de: int | None = None,
+        limit: int | None = None,
+    ) -> tuple[bytes, int | None] | None:
+        """
+        Página filtrada (categoría, prefijo de nombre) ordenada por id, con keyset por id.
+        Devuelve (json, id del último si hay más páginas) o None si el cache no está cargado.
+        """
+        prefijo = nombre.strip().lower() if nombre else None
+
+        with self._lock:
+            if self._productos is None:
+                return None
+
+            seleccion = []
+            for p in sorted(self._productos.values(), key=lambda p: p.id):
+                if despues_de is not None and p.id <= despues_de:
+                    continue
+                if categoria_id is not None and p.categoria_id != categoria_id:
+                    continue
+                if prefijo and not (p.nombre or "").lower().startswith(prefijo):
+                    continue
+                seleccion.append(p)
+                if limit is not None and len(seleccion) > limit:
+                    break
+
+        siguiente = None
+        if limit is not None and len(seleccion) > limit:
+            seleccion = seleccion[:limit]
+            siguiente = seleccion[-1].id
+
+        return b"[" + b",".join(p.json for p in seleccion) + b"]", siguiente
+
+    def categorias_json(self) -> bytes | None:
+        with self._lock:
+            if self._categorias is None:
+                return None
+            if self._json_categorias is None:
+                self._json_categorias = _dumps([
+                    {"nombre": c.nombre, "id": c.id}
+                    for c in sorted(self._categorias.values(), key=lambda c: c.nombre)
+                ])
+            return self._json_categorias
+
+    def existe_categoria(self, categoria_id: int) -> bool | None:
+        """
+        None si el cache no está cargado (hay que preguntarle a la base).
+        """
+        with self._lock:
+            if self._categorias is None:
+                return None
+            return categoria_id in self._categorias
+
+    # =======================
+    # ESCRITURA (después del commit)
+    # =======================
+    def guardar_producto(self, producto: Producto, orden: int | None = None):
+        """
+        Producto creado/editado. Una edición de un producto existente pasa el
+        `orden` que tomó con la fila bloqueada (como mover_stock), así una venta
+        vieja que llega tarde no pisa la cantidad editada, y una edición que
+        llega después de una venta más nueva no pisa el stock de esa venta.
+        """
+        with self._lock:
+            self._generacion += 1
+            vieja = False
+            if orden is not None:
+                if orden <= self._ultimo_orden_stock.get(producto.id, 0):
+                    vieja = True
+                else:
+                    self._ultimo_orden_stock[producto.id] = orden
+            if self._productos is None:
+                return
+            item = ProductoCache(producto)
+            previo = self._productos.get(producto.id)
+            if vieja and previo is not None:
+                item.cantidad = previo.cantidad
+            item.json = self._serializar(item)
+            self._productos[producto.id] = item
+            self._json_productos = None
+
+    def eliminar_producto(self, producto_id: int):
+        with self._lock:
+            self._generacion += 1
+            if self._productos is None:
+                return
+            self._productos.pop(producto_id, None)
+            self._json_productos = None
+
+    def orden_stock(self) -> int:
+        """
+        Número para fijar_stock. Se pide con la fila del producto todavía
+        bloqueada (antes del commit): dos escrituras del mismo producto
+        reciben números en el mismo orden en que quedaron en la base.
+        """
+        return next(self._ordenes_stock)
+
+    def fijar_stock(self, producto_id: int, cantidad: int, orden: int):
+        """
+        Pone el stock que devolvió la base (UPDATE ... RETURNING cantidad).
+        Con un valor absoluto, una carga en frío que ya leyó el cambio no lo
+        cuenta dos veces; con `orden`, una escritura vieja que llega tarde
+        no pisa a una más nueva.
+        """
+        with self._lock:
+            self._generacion += 1
+            if orden <= self._ultimo_orden_stock.get(producto_id, 0):
+                return
+            self._ultimo_orden_stock[producto_id] = orden
+            if self._productos is None:
+                return
+            item = self._productos.get(producto_id)
+            if item is None:
+                return
+            item.cantidad = cantidad
+            item.json = self._serializar(item)
+            self._json_productos = None
+
+    def guardar_categoria(self, categoria: Categoria):
+        with self._lock:
+            self._generacion += 1
+            if self._categorias is None:
+                return
+            self._categorias[categoria.id] = CategoriaCache(categoria.id, categoria.nombre)
+            self._json_categorias = None
+            # los productos de esta categoría llevan el nombre embebido
+            self._reserializar_categoria(categoria.id)
+
+    def eliminar_categoria(self, categoria_id: int):
+        with self._lock:
+            self._generacion += 1
+            if self._categorias is None:
+                return
+            self._categorias.pop(categoria_id, None)
+            self._json_categorias = None
+            self._reserializar_categoria(categoria_id)
+
+    def _reserializar_categoria(self, categoria_id: int):
+        cambio = False
+        for item in self._productos.values():
+            if item.categoria_id == categoria_id:
+                item.json = self._serializar(item)
+                cambio = True
+        if cambio:
+            self._json_productos = None
+
+
+catalogo = Catalogo()
@@ -0,0 +1,125 @@
+import mimetypes
+import os
+import re
+import stat
+from pathlib import Path
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.utils.uploads import programar_variantes
+
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+CACHE_VARIANTE_PENDIENTE = "public, max-age=60"
+
+# uploads: <sha256>.ext, <sha256>_<variante>.webp y los viejos <uuid4 hex>.ext
+# nunca se sobreescriben, así que el navegador puede guardarlos para siempre
+_NOMBRE_INMUTABLE = re.compile(r"^[0-9a-f]{32}(?:[0-9a-f]{32})?(?:_[a-z]+)?\.[a-z0-9]+$")
+_VARIANTE = re.compile(r"^(?P<hash>[0-9a-f]{64})_[a-z]+\.webp$")
+
+_YA_COMPRIMIDOS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".avif"}
+_PRECOMPRIMIDOS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _cache_control(path: str) -> str:
+    return CACHE_INMUTABLE if _NOMBRE_INMUTABLE.match(os.path.basename(path)) else "no-cache"
+
+
+def _es_archivo(stat_result: os.stat_result | None) -> bool:
+    return stat_result is not None and stat.S_ISREG(stat_result.st_mode)
+
+
+class StaticFilesCacheados(StaticFiles):
+    """
+    StaticFiles con cabeceras de cache:
+    - uploads con nombre por contenido -> Cache-Control immutable (1 año)
+    - el resto -> no-cache (revalida con ETag / Last-Modified, responde 304)
+    - si existe <archivo>.br / .gz y el cliente lo acepta, se sirve ese
+    - una variante (_thumb, _md) que todavía no se generó cae al original con cache corto
+
+    Range e If-None-Match / If-Modified-Since los resuelve FileResponse / StaticFiles.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] in ("GET", "HEAD"):
+            precomprimido = await self._precomprimido(path, scope)
+            if precomprimido is not None:
+                return precomprimido
+
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as exc:
+            if exc.status_code != 404:
+                raise
+            original = await self._original_de_variante(path, scope)
+            if original is None:
+                raise
+            return original
+
+    def file_response(self, full_path, stat_result, scope, status_code=200) -> Response:
+        return self._responder(full_path, stat_result, scope, _cache_control(str(full_path)), status_code)
+
+    # =======================
+    # HELPERS
+    # =======================
+    def _responder(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        cache_control: str,
+        status_code: int = 200,
+        media_type: str | None = None,
+        encoding: str | None = None,
+    ) -> Response:
+        response = FileResponse(
+            full_path,
+            status_code=status_code,
+            stat_result=stat_result,
+            media_type=media_type,
+            headers={"Cache-Control": cache_control},
+        )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+            response.headers["Vary"] = "Accept-Encoding"
+
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    async def _precomprimido(self, path: str, scope: Scope) -> Response | None:
+        if Path(path).suffix.lower() in _YA_COMPRIMIDOS:
+            return None
+
+        aceptados = Headers(scope=scope).get("accept-encoding", "")
+        for encoding, ext in _PRECOMPRIMIDOS:
+            if encoding not in aceptados:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + ext)
+            if _es_archivo(stat_result):
+                media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                return self._responder(
+                    full_path, stat_result, scope, _cache_control(path),
+                    media_type=media_type, encoding=encoding,
+                )
+        return None
+
+    async def _original_de_variante(self, path: str, scope: Scope) -> Response | None:
+        m = _VARIANTE.match(os.path.basename(path))
+        if not m:
+            return None
+
+        carpeta = os.path.dirname(path)
+        for ext in (".jpg", ".png", ".webp"):
+            full_path, stat_result = await anyio.to_thread.run_sync(
+                self.lookup_path, os.path.join(carpeta, m.group("hash") + ext)
+            )
+            if _es_archivo(stat_result):
+                # p.ej. subida antes de instalar Pillow: la pedimos de nuevo al worker
+                programar_variantes(Path(full_path))
+                return self._responder(full_path, stat_result, scope, CACHE_VARIANTE_PENDIENTE)
+        return None
@@ -0,0 +1,61 @@
+import asyncio
+import json
+import threading
+
+from app.utils.respuestas import json_default
+
+
+class BusEventos:
+    """
+    Bus de eventos en memoria (un solo proceso).
+    Los handlers publican después del commit; cada conexión suscrita tiene su propia cola.
+    publicar() se puede llamar desde el threadpool (handlers sync) o desde el event loop.
+    """
+
+    def __init__(self, max_cola: int = 200):
+        self.max_cola = max_cola
+        self._subs: dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self._lock = threading.Lock()
+
+    def suscribir(self) -> asyncio.Queue:
+        cola = asyncio.Queue(maxsize=self.max_cola)
+        with self._lock:
+            self._subs[cola] = asyncio.get_running_loop()
+        return cola
+
+    def desuscribir(self, cola: asyncio.Queue):
+        with self._lock:
+            self._subs.pop(cola, None)
+
+    def publicar(self, evento: dict):
+        with self._lock:
+            subs = list(self._subs.items())
+
+        for cola, loop in subs:
+            try:
+                loop.call_soon_threadsafe(self._encolar, cola, evento)
+            except RuntimeError:
+                # el loop ya se cerró
+                self.desuscribir(cola)
+
+    @staticmethod
+    def _encolar(cola: asyncio.Queue, evento: dict):
+        try:
+            cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            # cliente lento: descartamos lo pendiente y le pedimos que recargue todo
+            while not cola.empty():
+                cola.get_nowait()
+            cola.put_nowait({"tipo": "resync"})
+
+    @property
+    def suscriptores(self) -> int:
+        with self._lock:
+            return len(self._subs)
+
+
+bus = BusEventos()
+
+
+def evento_json(evento: dict) -> str:
+    return json.dumps(evento, default=json_default, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import Sequence
+
+
+# =======================
+# REGLA DE COBRO (un turno)
+# =======================
+def minutos_efectivos(
+    hora_inicio: datetime,
+    ahora: datetime,
+    pausa_acumulada_seg: int | None = 0,
+    pausa_inicio: datetime | None = None,
+) -> float:
+    """
+    Minutos jugados sin contar pausas (la acumulada + la pausa en curso si hay).
+    """
+    total_seg = int((ahora - hora_inicio).total_seconds())
+    pausa_seg = int(pausa_acumulada_seg or 0)
+    if pausa_inicio:
+        pausa_seg += int((ahora - pausa_inicio).total_seconds())
+    return max(0, total_seg - pausa_seg) / 60
+
+
+def cobro_tiempo(minutos: float, tarifa_hora: float) -> float:
+    """
+    Hasta 30 min se cobra media hora. Después, horas completas y la fracción
+    restante como hora completa si pasa de 30 min (>= 31) o media hora si no.
+    """
+    if minutos <= 30:
+        return tarifa_hora / 2
+
+    horas_completas = int(minutos // 60)
+    resto = minutos % 60
+
+    subtotal = horas_completas * tarifa_hora
+    subtotal += tarifa_hora if resto >= 31 else tarifa_hora / 2
+    return subtotal
+
+
+def total_final(subtotal_tiempo: float, subtotal_productos, servicios_extras, descuento) -> float:
+    return subtotal_tiempo + (subtotal_productos or 0) + (servicios_extras or 0) - (descuento or 0)
+
+
+# =======================
+# LOTE (muchos turnos a la vez)
+# =======================
+def cobros_tiempo(
+    hora_inicio: Sequence[datetime],
+    tarifa_hora: Sequence[float],
+    ahora: datetime,
+    pausa_acumulada_seg: Sequence[int | None],
+    pausa_inicio: Sequence[datetime | None],
+) -> list[float]:
+    """
+    subtotal_tiempo de N turnos a la vez (mismo resultado que cobro_tiempo uno por uno).
+    """
+    return [
+        cobro_tiempo(minutos_efectivos(inicio, ahora, acumulada, pausa), tarifa)
+        for inicio, tarifa, acumulada, pausa in zip(hora_inicio, tarifa_hora, pausa_acumulada_seg, pausa_inicio)
+    ]
+
+
+def liquidar_turnos(turnos: Sequence, ahora: datetime) -> list[tuple[float, float]]:
+    """
+    (subtotal_tiempo, total_final) al momento `ahora` de turnos abiertos/pausados,
+    sin modificarlos. Un solo paso para todas las mesas (GET /turnos/activos?en_vivo=true).
+    """
+    subtotales = cobros_tiempo(
+        [t.hora_inicio for t in turnos],
+        [t.tarifa_hora for t in turnos],
+        ahora,
+        [t.pausa_acumulada_seg for t in turnos],
+        [t.pausa_inicio for t in turnos],
+    )
+    return [
+        (s, total_final(s, t.subtotal_productos, t.servicios_extras, t.descuento))
+        for s, t in zip(subtotales, turnos)
+    ]
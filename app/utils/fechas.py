@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from fastapi import HTTPException
+
+
+def parse_fecha(fecha_str: str) -> datetime:
+    """
+    Recibe "2025-11-20" o "20/11/2025" y lo convierte a datetime.
+    Una fecha que no se puede leer es un 400, no un 500.
+    """
+    try:
+        if "/" in fecha_str:
+            d, m, y = fecha_str.split("/")
+            return datetime(int(y), int(m), int(d))
+        return datetime.fromisoformat(fecha_str)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Fecha inválida: {fecha_str!r} (use AAAA-MM-DD o DD/MM/AAAA)")
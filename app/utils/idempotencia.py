@@ -0,0 +1,224 @@
+import hashlib
+import threading
+import time
+from datetime import timedelta
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+from sqlalchemy import delete, func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.idempotencia import Idempotencia
+from app.utils.security import decode_token
+
+HEADER = "Idempotency-Key"
+HEADER_REPETIDA = "Idempotent-Replayed"
+
+# headers que no se guardan (los recalcula la respuesta repetida)
+_HEADERS_OMITIDOS = {"content-length", "date", "server"}
+
+# respuestas que no dependen de la operación sino del request/credenciales o de
+# una carrera (409/412 de versión, ver turnos._conflicto): no se guardan, el
+# reintento (token renovado, body corregido, If-Match nuevo) tiene que ejecutarse
+_STATUS_NO_GUARDADOS = {401, 403, 409, 412, 422, 429}
+
+_limpieza_lock = threading.Lock()
+_ultima_limpieza = 0.0
+
+
+class RespuestaRepetida(Exception):
+    """
+    La clave ya tiene respuesta: se corta antes del handler y se devuelve la guardada.
+    """
+    def __init__(self, guardada: Idempotencia):
+        self.guardada = guardada
+
+
+async def respuesta_repetida_handler(request: Request, exc: RespuestaRepetida) -> Response:
+    g = exc.guardada
+    headers = {k: v for k, v in (g.headers or [])}
+    headers[HEADER_REPETIDA] = "true"
+    return Response(content=g.body or b"", status_code=g.status_code, headers=headers)
+
+
+# =======================
+# BASE DE DATOS
+# =======================
+def limpiar_vencidas(db: Session) -> int:
+    result = db.execute(delete(Idempotencia).where(Idempotencia.expira < func.now()))
+    db.commit()
+    return result.rowcount or 0
+
+
+def _limpiar_si_toca(db: Session):
+    global _ultima_limpieza
+    ahora = time.monotonic()
+    with _limpieza_lock:
+        if ahora - _ultima_limpieza < settings.IDEMPOTENCIA_LIMPIEZA_MIN * 60:
+            return
+        _ultima_limpieza = ahora
+    limpiar_vencidas(db)
+
+
+def _reservar(clave: str, huella: str) -> Idempotencia | None:
+    """
+    Toma la clave (fila en_curso) o devuelve la fila que ya existe.
+    Una clave vencida se reutiliza como si no existiera.
+    """
+    with SessionLocal() as db:
+        _limpiar_si_toca(db)
+
+        stmt = pg_insert(Idempotencia).values(
+            clave=clave,
+            huella=huella,
+            estado="en_curso",
+            creado=func.now(),
+            expira=func.now() + timedelta(hours=settings.IDEMPOTENCIA_TTL_HORAS),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Idempotencia.clave],
+            set_={
+                "huella": stmt.excluded.huella,
+                "estado": "en_curso",
+                "status_code": None,
+                "headers": None,
+                "body": None,
+                "creado": stmt.excluded.creado,
+                "expira": stmt.excluded.expira,
+            },
+            where=Idempotencia.expira < func.now(),
+        ).returning(Idempotencia.clave)
+
+        tomada = db.execute(stmt).first()
+        db.commit()
+        if tomada:
+            return None
+
+        guardada = db.get(Idempotencia, clave)
+        if guardada is None:
+            # el dueño la liberó entre el INSERT y la lectura: que reintente
+            raise HTTPException(status_code=409, detail="El request original todavía está en curso, reintente")
+        return guardada
+
+
+def _guardar(clave: str, status_code: int, headers: list, body: bytes):
+    with SessionLocal() as db:
+        db.execute(
+            update(Idempotencia)
+            .where(Idempotencia.clave == clave)
+            .values(estado="completo", status_code=status_code, headers=headers, body=body)
+        )
+        db.commit()
+
+
+def _liberar(clave: str):
+    # falló (5xx / excepción / 401...): el reintento tiene que poder ejecutarse de nuevo
+    with SessionLocal() as db:
+        db.execute(delete(Idempotencia).where(Idempotencia.clave == clave, Idempotencia.estado == "en_curso"))
+        db.commit()
+
+
+# =======================
+# DEPENDENCIA (opt-in por endpoint)
+# =======================
+def _dueno(request: Request) -> str:
+    """
+    Usuario del token (sin ir a la base) para separar las claves por usuario;
+    sin token válido las claves quedan en el espacio "anon".
+    """
+    auth = request.headers.get("authorization") or ""
+    esquema, _, token = auth.partition(" ")
+    if esquema.lower() == "bearer" and token:
+        payload = decode_token(token.strip())
+        if payload and payload.get("sub") is not None:
+            return f"u{payload['sub']}"
+    return "anon"
+
+
+async def idempotente(request: Request):
+    """
+    dependencies=[Depends(idempotente)] en un endpoint de escritura.
+    Sin header no hace nada. Con Idempotency-Key:
+    - primera vez: se ejecuta y IdempotenciaMiddleware guarda la respuesta
+    - reintento: se devuelve la respuesta guardada (header Idempotent-Replayed: true)
+    - todavía en curso -> 409; misma clave con otro request -> 422
+    - 401/403/409/412/422/429 no se guardan: la clave queda libre para el reintento
+    Las claves son por usuario: la misma clave de dos usuarios no choca.
+    """
+    clave = (request.headers.get(HEADER) or "").strip()
+    if not clave:
+        return
+    if len(clave) > 200:
+        raise HTTPException(status_code=400, detail=f"{HEADER} inválida")
+    clave = f"{_dueno(request)}:{clave}"
+
+    body = await request.body()
+    huella = hashlib.sha256(f"{request.method} {request.url.path}\n".encode() + body).hexdigest()
+
+    guardada = await run_in_threadpool(_reservar, clave, huella)
+    if guardada is None:
+        request.state.idempotencia_clave = clave
+        return
+
+    if guardada.huella != huella:
+        raise HTTPException(status_code=422, detail=f"{HEADER} ya usada con otro request")
+    if guardada.estado != "completo":
+        raise HTTPException(status_code=409, detail="El request original todavía está en curso, reintente")
+    raise RespuestaRepetida(guardada)
+
+
+# =======================
+# MIDDLEWARE (ASGI puro: no re-empaqueta el body como BaseHTTPMiddleware)
+# =======================
+class IdempotenciaMiddleware:
+    """
+    Copia la respuesta de los requests que tomaron una clave en `idempotente`
+    y la guarda al terminar. Los demás requests pasan sin costo extra.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})  # mismo dict que request.state en el endpoint
+        inicio: dict = {}
+        partes: list[bytes] = []
+
+        async def send_copiando(message: Message):
+            if "idempotencia_clave" in state:
+                if message["type"] == "http.response.start":
+                    inicio.update(message)
+                elif message["type"] == "http.response.body":
+                    partes.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_copiando)
+        except Exception:
+            if "idempotencia_clave" in state:
+                await run_in_threadpool(_liberar, state["idempotencia_clave"])
+            raise
+
+        clave = state.get("idempotencia_clave")
+        if not clave:
+            return
+
+        status_code = inicio.get("status", 500)
+        if status_code >= 500 or status_code in _STATUS_NO_GUARDADOS:
+            await run_in_threadpool(_liberar, clave)
+            return
+
+        headers = [
+            [k.decode("latin-1"), v.decode("latin-1")]
+            for k, v in inicio.get("headers", [])
+            if k.decode("latin-1").lower() not in _HEADERS_OMITIDOS
+        ]
+        await run_in_threadpool(_guardar, clave, status_code, headers, b"".join(partes))
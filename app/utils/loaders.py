@@ -0,0 +1,36 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.turno import Turno
+from app.models.consumo import Consumo
+
+
+def turnos_full_stmt(*criterios):
+    """
+    SELECT de turnos con sus consumos y el producto de cada consumo ya precargados.
+    Siempre son 3 queries (turnos, consumos, productos), sin importar cuántos
+    turnos o líneas de consumo haya.
+    """
+    stmt = select(Turno)
+    if criterios:
+        stmt = stmt.where(*criterios)
+
+    return (
+        stmt.options(selectinload(Turno.consumos).selectinload(Consumo.producto))
+        .order_by(Turno.id)
+        # después de un commit la sesión puede tener el turno con datos viejos
+        .execution_options(populate_existing=True)
+    )
+
+
+def load_turnos_full(db: Session, *criterios) -> list[Turno]:
+    return list(db.scalars(turnos_full_stmt(*criterios)).all())
+
+
+def load_turno_full(db: Session, turno_id: int) -> Turno | None:
+    return db.scalars(turnos_full_stmt(Turno.id == turno_id)).first()
+
+
+async def load_turnos_full_async(db: AsyncSession, *criterios) -> list[Turno]:
+    return list((await db.scalars(turnos_full_stmt(*criterios))).all())
@@ -0,0 +1,192 @@
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+class ConsultasRequest:
+    """
+    SQL ejecutado durante un request. Es un objeto mutable a propósito: los endpoints
+    sync corren en el threadpool con una copia del contexto, pero apuntan al mismo objeto.
+    """
+    __slots__ = ("cantidad", "segundos")
+
+    def __init__(self):
+        self.cantidad = 0
+        self.segundos = 0.0
+
+
+_consultas_request: ContextVar[ConsultasRequest | None] = ContextVar("consultas_request", default=None)
+
+
+# =======================
+# TIPOS DE MÉTRICA
+# =======================
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(labels: tuple, nombres: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{n}="{_escapar(v)}"' for n, v in zip(nombres, labels)) + "}"
+
+
+class Contador:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._valores: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, valor: float = 1):
+        with self._lock:
+            self._valores[labels] = self._valores.get(labels, 0) + valor
+
+    def exponer(self) -> list[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            for labels, v in sorted(self._valores.items()):
+                lineas.append(f"{self.nombre}{_etiquetas(labels, self.etiquetas)} {v}")
+        return lineas
+
+
+class Histograma:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple, buckets: tuple):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}  # labels -> [conteo por bucket..., suma, total]
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, *labels):
+        with self._lock:
+            serie = self._series.get(labels)
+            if serie is None:
+                serie = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[i] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def exponer(self) -> list[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        nombres_le = self.etiquetas + ("le",)
+        with self._lock:
+            for labels, serie in sorted(self._series.items()):
+                for limite, n in zip(self.buckets, serie):
+                    lineas.append(f"{self.nombre}_bucket{_etiquetas(labels + (limite,), nombres_le)} {n}")
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(labels + ('+Inf',), nombres_le)} {serie[-1]}")
+                lineas.append(f"{self.nombre}_sum{_etiquetas(labels, self.etiquetas)} {serie[-2]}")
+                lineas.append(f"{self.nombre}_count{_etiquetas(labels, self.etiquetas)} {serie[-1]}")
+        return lineas
+
+
+# =======================
+# REGISTRO
+# =======================
+requests_total = Contador(
+    "http_requests_total", "Requests HTTP por ruta y status.", ("method", "route", "status"),
+)
+request_duracion = Histograma(
+    "http_request_duration_seconds", "Latencia de los requests HTTP.", ("method", "route"), BUCKETS_SEGUNDOS,
+)
+request_consultas = Histograma(
+    "http_request_db_queries", "Sentencias SQL ejecutadas por request.", ("method", "route"), BUCKETS_CONSULTAS,
+)
+request_db_duracion = Histograma(
+    "http_request_db_seconds", "Tiempo en la base por request.", ("method", "route"), BUCKETS_SEGUNDOS,
+)
+db_sentencias = Contador("db_statements_total", "Sentencias SQL ejecutadas (con o sin request).")
+db_segundos = Contador("db_statement_seconds_total", "Tiempo total de las sentencias SQL.")
+
+METRICAS = (requests_total, request_duracion, request_consultas, request_db_duracion, db_sentencias, db_segundos)
+
+
+def exponer_metricas(extra: list[str] | None = None) -> str:
+    lineas = []
+    for m in METRICAS:
+        lineas.extend(m.exponer())
+    lineas.extend(extra or [])
+    return "\n".join(lineas) + "\n"
+
+
+# =======================
+# SQLALCHEMY
+# =======================
+def instrumentar_engine(engine: Engine):
+    """
+    Cuenta y mide cada sentencia del engine (para el async: async_engine.sync_engine).
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        context._metricas_inicio = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        inicio = getattr(context, "_metricas_inicio", None)
+        if inicio is None:
+            return
+        segundos = time.perf_counter() - inicio
+
+        db_sentencias.inc()
+        db_segundos.inc(valor=segundos)
+
+        consultas = _consultas_request.get()
+        if consultas is not None:
+            consultas.cantidad += 1
+            consultas.segundos += segundos
+
+
+# =======================
+# MIDDLEWARE
+# =======================
+def _ruta(scope: Scope) -> str:
+    # plantilla de la ruta (/turnos/{turno_id}/cerrar), no la URL: cardinalidad acotada
+    route = scope.get("route")
+    return getattr(route, "path", None) or "sin_ruta"
+
+
+class MetricasMiddleware:
+    """
+    Latencia, status y SQL (cantidad y tiempo) de cada request HTTP, por ruta.
+    ASGI puro: no toca el body; el tiempo incluye el envío completo (también streaming).
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        consultas = ConsultasRequest()
+        token = _consultas_request.set(consultas)
+        status = [500]
+        inicio = time.perf_counter()
+
+        async def send_midiendo(message: Message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_midiendo)
+        finally:
+            duracion = time.perf_counter() - inicio
+            _consultas_request.reset(token)
+
+            metodo, ruta = scope["method"], _ruta(scope)
+            requests_total.inc(metodo, ruta, str(status[0]))
+            request_duracion.observar(duracion, metodo, ruta)
+            request_consultas.observar(consultas.cantidad, metodo, ruta)
+            request_db_duracion.observar(consultas.segundos, metodo, ruta)
@@ -0,0 +1,46 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, Query, Response
+
+from app.config import settings
+
+LIMITE_MAX = 500
+
+# listados que crecen sin límite (gastos, consumos, users): siempre paginados,
+# sin ?limit= se devuelve una página de PAGINA_DEFAULT y X-Next-Cursor
+PaginaQuery = Query(default=settings.PAGINA_DEFAULT, ge=1, le=LIMITE_MAX)
+
+# catálogo de productos: sin limit = lista completa (sale de memoria, la carta es chica)
+LimitQuery = Query(default=None, ge=1, le=LIMITE_MAX)
+
+
+def codificar_cursor(*valores) -> str:
+    """
+    Cursor opaco con los valores de la clave de orden del último elemento devuelto.
+    """
+    data = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, *tipos) -> list:
+    """
+    Devuelve los valores del cursor convertidos con `tipos` (ej: int, datetime.fromisoformat).
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(valores, list) or len(valores) != len(tipos):
+            raise ValueError(cursor)
+        return [tipo(v) for tipo, v in zip(tipos, valores)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def poner_siguiente(response: Response, siguiente: str | None):
+    """
+    El cursor de la página siguiente va en el header X-Next-Cursor (el cuerpo sigue siendo una lista).
+    """
+    if siguiente:
+        response.headers["X-Next-Cursor"] = siguiente
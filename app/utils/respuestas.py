@@ -0,0 +1,41 @@
+from datetime import datetime
+from functools import lru_cache
+
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+
+from app.config import settings
+
+# orjson es obligatorio (requirements.txt): turno_to_dict y los reportes devuelven
+# datetime sin convertir, y el json estándar de JSONResponse no los serializa
+RespuestaJSON = ORJSONResponse
+
+
+def json_default(valor):
+    """
+    default= para json.dumps en lo que no pasa por orjson (export NDJSON, eventos SSE).
+    """
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    raise TypeError(f"No serializable: {type(valor).__name__}")
+
+
+@lru_cache(maxsize=None)
+def adapter(tipo) -> TypeAdapter:
+    """
+    TypeAdapter compilado una sola vez por tipo (el schema de validación se arma al crearlo).
+    """
+    return TypeAdapter(tipo)
+
+
+def respuesta_json(data, tipo=None, status_code: int = 200) -> ORJSONResponse:
+    """
+    Devuelve data (dicts/listas ya armados por el endpoint) serializada directo.
+
+    Al devolver un Response, FastAPI no vuelve a validar contra response_model:
+    el response_model queda solo para la documentación. Con VALIDAR_RESPUESTAS
+    se valida contra `tipo` igual (desarrollo / tests) para detectar desvíos.
+    """
+    if tipo is not None and settings.VALIDAR_RESPUESTAS:
+        adapter(tipo).validate_python(data)
+    return RespuestaJSON(content=data, status_code=status_code)
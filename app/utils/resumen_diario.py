@@ -0,0 +1,126 @@
+"""
+Mantenimiento y lectura de la tabla resumen_diario.
+
+Reconstruir el histórico (por ejemplo después de crear la tabla):
+    python -m app.utils.resumen_diario
+    python -m app.utils.resumen_diario --desde 2025-01-01 --hasta 2025-01-31
+"""
+from datetime import date, datetime
+
+from sqlalchemy import select, delete, insert, func, cast, Date
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.turno import Turno
+from app.models.resumen_diario import ResumenDiario
+from app.utils.totales import columnas_totales
+
+CLAVE = ("dia", "mesa_id", "atendido_por_id", "cobrado_por_id")
+TOTALES = (
+    "cantidad_turnos",
+    "total_tiempo",
+    "total_productos",
+    "total_descuentos",
+    "total_servicios_extras",
+    "total_general",
+)
+
+
+def registrar_turno_cerrado(db: Session, turno: Turno):
+    """
+    Suma un turno recién cerrado a su fila de resumen_diario (INSERT ... ON CONFLICT).
+    No hace commit: corre en la misma transacción que el cierre del turno.
+    """
+    valores = {
+        "dia": turno.hora_fin.date(),
+        "mesa_id": turno.mesa_id or 0,
+        "atendido_por_id": turno.atendido_por_id or 0,
+        "cobrado_por_id": turno.cobrado_por_id or 0,
+        "cantidad_turnos": 1,
+        "total_tiempo": float(turno.subtotal_tiempo or 0),
+        "total_productos": float(turno.subtotal_productos or 0),
+        "total_descuentos": float(turno.descuento or 0),
+        "total_servicios_extras": float(turno.servicios_extras or 0),
+        "total_general": float(turno.total_final or 0),
+    }
+
+    stmt = pg_insert(ResumenDiario).values(**valores)
+    tabla = ResumenDiario.__table__
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(CLAVE),
+        set_={col: tabla.c[col] + stmt.excluded[col] for col in TOTALES},
+    )
+    db.execute(stmt)
+
+
+def reconstruir_resumen_diario(db: Session, desde: date | None = None, hasta: date | None = None) -> int:
+    """
+    Recalcula resumen_diario desde la tabla turnos (INSERT ... SELECT ... GROUP BY).
+    Sin fechas reconstruye todo. Devuelve la cantidad de filas generadas.
+    """
+    dia = cast(Turno.hora_fin, Date)
+
+    borrar = delete(ResumenDiario)
+    filtros = [Turno.estado == "cerrado", Turno.hora_fin != None]
+    if desde is not None:
+        borrar = borrar.where(ResumenDiario.dia >= desde)
+        filtros.append(dia >= desde)
+    if hasta is not None:
+        borrar = borrar.where(ResumenDiario.dia <= hasta)
+        filtros.append(dia <= hasta)
+
+    mesa_id = func.coalesce(Turno.mesa_id, 0)
+    atendido_por_id = func.coalesce(Turno.atendido_por_id, 0)
+    cobrado_por_id = func.coalesce(Turno.cobrado_por_id, 0)
+
+    origen = (
+        select(dia, mesa_id, atendido_por_id, cobrado_por_id, *columnas_totales())
+        .select_from(Turno)
+        .where(*filtros)
+        .group_by(dia, mesa_id, atendido_por_id, cobrado_por_id)
+    )
+
+    db.execute(borrar)
+    result = db.execute(insert(ResumenDiario).from_select(list(CLAVE + TOTALES), origen))
+    db.commit()
+    return result.rowcount
+
+
+def columnas_totales_diario():
+    """
+    Igual que columnas_totales() pero sumando las filas de resumen_diario.
+    """
+    return tuple(
+        func.coalesce(func.sum(getattr(ResumenDiario, col)), 0).label(col)
+        for col in TOTALES
+    )
+
+
+def filtros_diario(desde: date, hasta: date, mesa_id: int | None = None) -> list:
+    filtros = [ResumenDiario.dia >= desde, ResumenDiario.dia <= hasta]
+    if mesa_id is not None:
+        filtros.append(ResumenDiario.mesa_id == mesa_id)
+    return filtros
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.database import SessionLocal
+    from app import models  # noqa: F401  carga todos los modelos
+
+    parser = argparse.ArgumentParser(description="Reconstruye resumen_diario desde los turnos cerrados")
+    parser.add_argument("--desde", help="YYYY-MM-DD (incluido)")
+    parser.add_argument("--hasta", help="YYYY-MM-DD (incluido)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        filas = reconstruir_resumen_diario(
+            db,
+            desde=datetime.fromisoformat(args.desde).date() if args.desde else None,
+            hasta=datetime.fromisoformat(args.hasta).date() if args.hasta else None,
+        )
+        print(f"resumen_diario reconstruido: {filas} filas")
+    finally:
+        db.close()
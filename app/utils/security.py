@@ -1,22 +1,109 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
+import hashlib
+import threading
+import time
+import bcrypt
+from fastapi import HTTPException
 from jose import jwt, JWTError
 from argon2 import PasswordHasher
 from app.config import settings
+from app.utils.cache import TTLCache
 
-ph = PasswordHasher()
+# parámetros actuales: los hashes con otros parámetros (o bcrypt viejos) se rehacen al hacer login
+ph = PasswordHasher(
+    time_cost=settings.ARGON2_TIME_COST,
+    memory_cost=settings.ARGON2_MEMORY_COST,
+    parallelism=settings.ARGON2_PARALLELISM,
+)
 
+# el hashing corre en su propio pool para no acaparar el threadpool de los requests;
+# si ya hay demasiados en cola se responde 503 en lugar de esperar
+_hash_executor = ThreadPoolExecutor(max_workers=settings.HASH_WORKERS, thread_name_prefix="hash")
+_hash_cupos = threading.BoundedSemaphore(settings.HASH_WORKERS + settings.HASH_MAX_PENDING)
 
-def hash_password(password: str) -> str:
-    return ph.hash(password)
+# sha256(token) -> payload ya verificado, hasta su "exp"
+tokens_cache = TTLCache(maxsize=settings.TOKEN_CACHE_MAX, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
 
 
-def verify_password(password: str, hashed: str) -> bool:
+def _enviar_hash(fn, *args) -> Future:
+    if not _hash_cupos.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor ocupado, intente de nuevo en unos segundos",
+            headers={"Retry-After": "1"},
+        )
+
+    try:
+        future = _hash_executor.submit(fn, *args)
+    except Exception:
+        _hash_cupos.release()
+        raise
+
+    future.add_done_callback(lambda _: _hash_cupos.release())
+    return future
+
+
+def _en_executor_hash(fn, *args):
+    # bloquea el hilo que llama: solo para endpoints sync poco frecuentes (alta de usuarios)
+    return _enviar_hash(fn, *args).result()
+
+
+async def _en_executor_hash_async(fn, *args):
+    # el request espera en el event loop, sin ocupar un hilo del threadpool
+    return await asyncio.wrap_future(_enviar_hash(fn, *args))
+
+
+def _es_bcrypt(hashed: str) -> bool:
+    return hashed.startswith(("$2a$", "$2b$", "$2y$"))
+
+
+def _verificar(password: str, hashed: str) -> bool:
+    if not hashed:
+        return False
+
+    # usuarios creados antes con passlib/bcrypt
+    if _es_bcrypt(hashed):
+        try:
+            return bcrypt.checkpw(password.encode(), hashed.encode())
+        except ValueError:
+            return False
+
     try:
         return ph.verify(hashed, password)
     except Exception:
         return False
 
 
+def hash_password(password: str) -> str:
+    return _en_executor_hash(ph.hash, password)
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    return _en_executor_hash(_verificar, password, hashed)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _en_executor_hash_async(ph.hash, password)
+
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    return await _en_executor_hash_async(_verificar, password, hashed)
+
+
+def necesita_rehash(hashed: str) -> bool:
+    """
+    True si el hash es bcrypt o argon2 con parámetros distintos a los actuales.
+    """
+    if _es_bcrypt(hashed):
+        return True
+    try:
+        return ph.check_needs_rehash(hashed)
+    except Exception:
+        return True
+
+
 def create_access_token(data: dict, expires_minutes: int = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(
@@ -33,12 +120,26 @@ def create_access_token(data: dict, expires_minutes: int = None):
 
 
 def decode_token(token: str):
+    # cada tablet manda el mismo token miles de veces: la firma se verifica una sola vez
+    clave = hashlib.sha256(token.encode()).hexdigest()
+    payload = tokens_cache.get(clave)
+    if payload is not None:
+        return payload
+
     try:
         payload = jwt.decode(
             token,
             settings.SECRET_KEY,
             algorithms=[settings.ALGORITHM]
         )
-        return payload
     except JWTError:
         return None
+
+    # solo se cachea hasta que vence (sin exp no se cachea)
+    exp = payload.get("exp")
+    if exp is not None:
+        restante = float(exp) - time.time()
+        if restante > 0:
+            tokens_cache.set(clave, payload, ttl=restante)
+
+    return payload
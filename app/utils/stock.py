@@ -0,0 +1,94 @@
+from typing import NamedTuple
+
+from fastapi import HTTPException
+from sqlalchemy import select, update, func
+from sqlalchemy.orm import Session
+
+from app.models.producto import Producto
+from app.models.turno import Turno
+from app.utils.catalogo import catalogo
+
+ESTADOS_ACTIVOS = ("abierto", "pausado")
+
+
+class MovimientoStock(NamedTuple):
+    precio_venta: float
+    cantidad: int  # stock ya actualizado
+    orden: int  # para catalogo.fijar_stock después del commit
+
+
+# =======================
+# STOCK
+# =======================
+def mover_stock(db: Session, producto_id: int, delta: int):
+    """
+    Suma `delta` al stock en un solo UPDATE condicional (sin leer y reescribir en Python):
+
+        UPDATE productos SET cantidad = cantidad + :delta
+        WHERE id = :id AND cantidad >= -:delta
+        RETURNING precio_venta, cantidad
+
+    Dos ventas simultáneas del último producto: la segunda no encuentra fila -> 400.
+    Devuelve el MovimientoStock; después del commit va a catalogo.fijar_stock.
+    """
+    fila = db.execute(
+        update(Producto)
+        .where(Producto.id == producto_id, Producto.cantidad >= -delta)
+        .values(cantidad=Producto.cantidad + delta)
+        .returning(Producto.precio_venta, Producto.cantidad)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+    if fila is None:
+        existe = db.execute(select(Producto.id).where(Producto.id == producto_id)).first()
+        if existe is None:
+            raise HTTPException(status_code=404, detail="Producto no encontrado")
+        raise HTTPException(status_code=400, detail="Stock insuficiente")
+    # la fila sigue bloqueada hasta el commit: el orden refleja el de la base
+    return MovimientoStock(fila.precio_venta, fila.cantidad, catalogo.orden_stock())
+
+
+def devolver_stock(db: Session, producto_id: int, cantidad: int) -> MovimientoStock | None:
+    """
+    Devuelve stock (p.ej. al eliminar un consumo). None si el producto ya no existe.
+    """
+    fila = db.execute(
+        update(Producto)
+        .where(Producto.id == producto_id)
+        .values(cantidad=Producto.cantidad + cantidad)
+        .returning(Producto.precio_venta, Producto.cantidad)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if fila is None:
+        return None
+    return MovimientoStock(fila.precio_venta, fila.cantidad, catalogo.orden_stock())
+
+
+# =======================
+# SUBTOTAL DEL TURNO
+# =======================
+def sumar_subtotal_productos(
+    db: Session,
+    turno_id: int,
+    monto: float,
+    estados: tuple[str, ...] = ESTADOS_ACTIVOS,
+    detalle: str = "Turno no encontrado o ya cerrado",
+):
+    """
+    subtotal_productos += monto en la base (UPDATE ... RETURNING), solo si el turno
+    sigue en alguno de `estados`. Devuelve (id, mesa_id, subtotal_productos).
+    """
+    fila = db.execute(
+        update(Turno)
+        .where(Turno.id == turno_id, Turno.estado.in_(estados))
+        .values(
+            subtotal_productos=func.coalesce(Turno.subtotal_productos, 0) + monto,
+            version=Turno.version + 1,  # un cierre/pausa que leyó antes va a dar conflicto
+        )
+        .returning(Turno.id, Turno.mesa_id, Turno.subtotal_productos)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+    if fila is None:
+        raise HTTPException(status_code=404, detail=detalle)
+    return fila
@@ -0,0 +1,37 @@
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from app.models.turno import Turno
+
+
+def columnas_totales():
+    """
+    Columnas agregadas (SUM en la base de datos) de los totales de turnos.
+    """
+    return (
+        func.count(Turno.id).label("cantidad_turnos"),
+        func.coalesce(func.sum(Turno.subtotal_tiempo), 0).label("total_tiempo"),
+        func.coalesce(func.sum(Turno.subtotal_productos), 0).label("total_productos"),
+        func.coalesce(func.sum(Turno.descuento), 0).label("total_descuentos"),
+        func.coalesce(func.sum(Turno.servicios_extras), 0).label("total_servicios_extras"),
+        func.coalesce(func.sum(Turno.total_final), 0).label("total_general"),
+    )
+
+
+def fila_totales(row) -> dict:
+    return {
+        "cantidad_turnos": int(row.cantidad_turnos or 0),
+        "total_tiempo": float(row.total_tiempo or 0),
+        "total_productos": float(row.total_productos or 0),
+        "total_descuentos": float(row.total_descuentos or 0),
+        "total_servicios_extras": float(row.total_servicios_extras or 0),
+        "total_general": float(row.total_general or 0),
+    }
+
+
+def totales_turnos(db: Session, *filtros) -> dict:
+    """
+    Totales de los turnos que cumplen los filtros, calculados con un solo SELECT.
+    """
+    row = db.execute(select(*columnas_totales()).select_from(Turno).where(*filtros)).one()
+    return fila_totales(row)
@@ -0,0 +1,164 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from uuid import uuid4
+
+from fastapi import HTTPException, UploadFile
+
+from app.config import settings
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow es opcional: sin él se guarda solo el original
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+UPLOADS_DIR = Path(__file__).resolve().parents[1] / "static" / "uploads"
+EXTENSIONES_PERMITIDAS = {".jpg", ".jpeg", ".png", ".webp"}
+
+# variantes que genera el worker: sufijo -> lado máximo en px
+VARIANTES = {
+    "thumb": settings.UPLOAD_THUMB_PX,
+    "md": settings.UPLOAD_MD_PX,
+}
+
+_CHUNK = 64 * 1024
+_NOMBRE_HASH = re.compile(r"^(?P<base>.*/[0-9a-f]{64})\.[a-z]+$")
+
+# un solo hilo: las miniaturas no compiten con los requests por CPU
+_variantes_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="thumbs")
+
+# cada original se encola una sola vez; uno que no se pudo decodificar se
+# reintenta recién después de REINTENTO_FALLIDAS_SEG (no en cada request del thumb)
+REINTENTO_FALLIDAS_SEG = 600
+_variantes_lock = threading.Lock()
+_variantes_en_curso: set[Path] = set()
+_variantes_fallidas: dict[Path, float] = {}  # original -> time.monotonic() del fallo
+
+
+# =======================
+# GUARDADO
+# =======================
+def guardar_imagen(imagen: UploadFile, carpeta: str) -> str:
+    """
+    Guarda la imagen en static/uploads/<carpeta>/<sha256><ext> leyendo por bloques
+    y devuelve su URL. Si el mismo archivo ya se subió antes se reutiliza.
+    Las variantes (_thumb.webp, _md.webp) se generan en segundo plano.
+    """
+    ext = Path(imagen.filename or "").suffix.lower()
+    if ext not in EXTENSIONES_PERMITIDAS:
+        raise HTTPException(status_code=400, detail="Formato de imagen no permitido")
+    if ext == ".jpeg":
+        ext = ".jpg"
+
+    destino_dir = UPLOADS_DIR / carpeta
+    destino_dir.mkdir(parents=True, exist_ok=True)
+
+    max_bytes = settings.UPLOAD_MAX_MB * 1024 * 1024
+    sha = hashlib.sha256()
+    total = 0
+    temporal = destino_dir / f".{uuid4().hex}.part"
+
+    try:
+        with open(temporal, "wb") as f:
+            while chunk := imagen.file.read(_CHUNK):
+                total += len(chunk)
+                if total > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"La imagen supera el máximo de {settings.UPLOAD_MAX_MB} MB",
+                    )
+                sha.update(chunk)
+                f.write(chunk)
+
+        if total == 0:
+            raise HTTPException(status_code=400, detail="La imagen está vacía")
+
+        filename = f"{sha.hexdigest()}{ext}"
+        filepath = destino_dir / filename
+        if filepath.exists():
+            temporal.unlink()  # ✅ ya estaba subida: misma URL, nada que escribir
+        else:
+            os.replace(temporal, filepath)
+    finally:
+        if temporal.exists():
+            temporal.unlink()
+
+    programar_variantes(filepath)
+    return f"/static/uploads/{carpeta}/{filename}"
+
+
+# =======================
+# VARIANTES
+# =======================
+def ruta_variante(original: Path, sufijo: str) -> Path:
+    return original.with_name(f"{original.stem}_{sufijo}.webp")
+
+
+def variante_url(imagen_url: str | None, sufijo: str) -> str | None:
+    """
+    URL de la variante de una imagen subida por guardar_imagen.
+    Las imágenes viejas (uuid) o externas no tienen variantes: se devuelve la original.
+    """
+    if not imagen_url:
+        return None
+    m = _NOMBRE_HASH.match(imagen_url)
+    if not m:
+        return imagen_url
+    return f"{m.group('base')}_{sufijo}.webp"
+
+
+def _generar_variantes(original: Path):
+    try:
+        with Image.open(original) as img:
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+            for sufijo, lado in VARIANTES.items():
+                destino = ruta_variante(original, sufijo)
+                if destino.exists():
+                    continue
+                copia = img.copy()
+                copia.thumbnail((lado, lado))
+                temporal = destino.with_name(f".{uuid4().hex}.part")
+                copia.save(temporal, format="WEBP", quality=80, method=4)
+                os.replace(temporal, destino)
+    except Exception:
+        logger.exception("No se pudieron generar las variantes de %s", original.name)
+        with _variantes_lock:
+            _variantes_fallidas[original] = time.monotonic()
+    else:
+        with _variantes_lock:
+            _variantes_fallidas.pop(original, None)
+    finally:
+        with _variantes_lock:
+            _variantes_en_curso.discard(original)
+
+
+def programar_variantes(original: Path):
+    if Image is None:
+        return
+    if all(ruta_variante(original, s).exists() for s in VARIANTES):
+        return
+
+    with _variantes_lock:
+        if original in _variantes_en_curso:
+            return
+        fallo = _variantes_fallidas.get(original)
+        if fallo is not None and time.monotonic() - fallo < REINTENTO_FALLIDAS_SEG:
+            return
+        _variantes_en_curso.add(original)
+
+    try:
+        _variantes_executor.submit(_generar_variantes, original)
+    except Exception:
+        with _variantes_lock:
+            _variantes_en_curso.discard(original)
+        raise
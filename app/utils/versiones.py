@@ -0,0 +1,58 @@
+import threading
+from uuid import uuid4
+
+from fastapi import Request, Response
+
+
+class VersionesRecursos:
+    """
+    Contador de versión por recurso ("productos", "mesas", ...).
+    Cada endpoint que escribe un recurso llama a bump() después del commit, y el
+    ETag de los listados sale del contador, sin consultar la base.
+    El id de arranque evita repetir ETags después de reiniciar. Los contadores
+    viven en el proceso: pensado para un solo worker (ver Procfile).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versiones: dict[str, int] = {}
+        self._arranque = uuid4().hex[:8]
+
+    def bump(self, *recursos: str):
+        with self._lock:
+            for recurso in recursos:
+                self._versiones[recurso] = self._versiones.get(recurso, 0) + 1
+
+    def etag(self, recurso: str) -> str:
+        with self._lock:
+            version = self._versiones.get(recurso, 0)
+        return f'"{recurso}-{self._arranque}-{version}"'
+
+
+versiones = VersionesRecursos()
+
+
+def _coincide(if_none_match: str, etag: str) -> bool:
+    for valor in if_none_match.split(","):
+        valor = valor.strip()
+        if valor == "*" or valor.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def no_modificado(request: Request, response: Response, recurso: str) -> Response | None:
+    """
+    Si el cliente ya tiene la versión actual devuelve un 304 listo para retornar;
+    si no, agrega el ETag a la respuesta y devuelve None.
+    Se llama ANTES de consultar la base: si hay una escritura en el medio, el ETag
+    queda viejo y el próximo poll simplemente recibe un 200.
+    """
+    etag = versiones.etag(recurso)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _coincide(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
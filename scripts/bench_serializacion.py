@@ -0,0 +1,141 @@
+"""
+Micro-benchmark de serialización de /turnos/activos y /reportes (sin base de datos).
+
+    python scripts/bench_serializacion.py
+    python scripts/bench_serializacion.py --turnos 40 --reportes 2000 --n 200
+
+"antes": dicts/modelos validados contra el response_model por FastAPI y
+serializados con json estándar (lo que hacía FastAPI con response_model).
+"ahora": respuesta_json, dicts serializados directo con orjson.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# valores de relleno para poder importar la configuración sin un .env
+for clave, valor in {
+    "POSTGRES_USER": "x", "POSTGRES_PASSWORD": "x", "POSTGRES_DB": "x",
+    "POSTGRES_HOST": "localhost", "POSTGRES_PORT": "5432",
+    "SECRET_KEY": "bench", "ALGORITHM": "HS256", "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+}.items():
+    os.environ.setdefault(clave, valor)
+
+from app.routers.turnos import turno_to_dict  # noqa: E402
+from app.routers.reportes import _reporte_turno_dict, user_label  # noqa: E402
+from app.schemas.turno_schema import TurnoOut  # noqa: E402
+from app.schemas.report_schema import ReporteOut, ReporteTurno, ReporteConsumo  # noqa: E402
+from app.utils.respuestas import RespuestaJSON, adapter, respuesta_json  # noqa: E402
+
+
+def _turno(i: int, consumos: int, cerrado: bool = False):
+    inicio = datetime(2025, 11, 20, 14, 0) + timedelta(minutes=i)
+    producto = SimpleNamespace(nombre=f"Producto {i % 30}")
+    return SimpleNamespace(
+        id=i, mesa_id=i % 12 + 1, mesa=SimpleNamespace(nombre=f"Mesa {i % 12 + 1}"),
+        hora_inicio=inicio, hora_fin=inicio + timedelta(minutes=95) if cerrado else None,
+        tarifa_hora=20.0, subtotal_tiempo=31.5, subtotal_productos=24.0,
+        servicios_extras=0.0, descuento=0.0, total_final=55.5,
+        estado="cerrado" if cerrado else "abierto", pausa_inicio=None, pausa_acumulada_seg=120,
+        consumos=[
+            SimpleNamespace(id=i * 10 + j, producto_id=j, producto=producto, cantidad=2, subtotal=12.0)
+            for j in range(consumos)
+        ],
+    )
+
+
+def _dumps_estandar(contenido) -> bytes:
+    # igual que JSONResponse.render
+    return json.dumps(contenido, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def _antes_fastapi(data, tipo) -> bytes:
+    # response_model: validar + serializar en modo json + json.dumps
+    ta = adapter(tipo)
+    return _dumps_estandar(ta.dump_python(ta.validate_python(data), mode="json"))
+
+
+def _reporte_antes(rows) -> bytes:
+    turnos = []
+    for t, u_at, u_co in rows:
+        turnos.append(ReporteTurno(
+            mesa=t.mesa.nombre,
+            atendido_por=user_label(u_at),
+            facturado_por=user_label(u_co),
+            hora_inicio=t.hora_inicio,
+            hora_fin=t.hora_fin,
+            tiempo_total_min=int((t.hora_fin - t.hora_inicio).total_seconds() / 60),
+            subtotal_tiempo=float(t.subtotal_tiempo or 0),
+            subtotal_productos=float(t.subtotal_productos or 0),
+            descuento=float(t.descuento or 0),
+            servicios_extras=float(t.servicios_extras or 0),
+            total_final=float(t.total_final or 0),
+            consumos=[
+                ReporteConsumo(producto_nombre=c.producto.nombre, cantidad=c.cantidad, subtotal=c.subtotal)
+                for c in t.consumos
+            ],
+        ))
+    reporte = ReporteOut(
+        fecha_inicio="2025-11-01", fecha_fin="2025-11-30", mesa_id=None, turnos=turnos,
+        total_tiempo=0.0, total_productos=0.0, total_descuentos=0.0,
+        total_servicios_extras=0.0, total_general=0.0,
+    )
+    return _antes_fastapi(reporte, ReporteOut)
+
+
+def _reporte_ahora(rows) -> bytes:
+    turnos = [_reporte_turno_dict(t, u_at, u_co) for (t, u_at, u_co) in rows]
+    return respuesta_json({
+        "fecha_inicio": "2025-11-01", "fecha_fin": "2025-11-30", "mesa_id": None, "turnos": turnos,
+        "total_tiempo": 0.0, "total_productos": 0.0, "total_descuentos": 0.0,
+        "total_servicios_extras": 0.0, "total_general": 0.0,
+    }, ReporteOut).body
+
+
+def medir(fn, n: int) -> float:
+    fn()  # calentamiento (compila los TypeAdapter)
+    inicio = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - inicio) / n * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turnos", type=int, default=20, help="turnos activos")
+    parser.add_argument("--reportes", type=int, default=1000, help="turnos en el reporte")
+    parser.add_argument("--consumos", type=int, default=4, help="consumos por turno")
+    parser.add_argument("--n", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"encoder: {RespuestaJSON.__name__}")
+
+    activos = [_turno(i, args.consumos) for i in range(args.turnos)]
+    usuario = SimpleNamespace(username="cajero")
+    rows = [(_turno(i, args.consumos, cerrado=True), usuario, usuario) for i in range(args.reportes)]
+
+    casos = {
+        f"/turnos/activos ({args.turnos})": (
+            lambda: _antes_fastapi([turno_to_dict(t) for t in activos], list[TurnoOut]),
+            lambda: respuesta_json([turno_to_dict(t) for t in activos], list[TurnoOut]).body,
+        ),
+        f"/reportes ({args.reportes})": (
+            lambda: _reporte_antes(rows),
+            lambda: _reporte_ahora(rows),
+        ),
+    }
+
+    for nombre, (antes, ahora) in casos.items():
+        ms_antes = medir(antes, args.n)
+        ms_ahora = medir(ahora, args.n)
+        print(f"{nombre:28} antes {ms_antes:8.3f} ms  ahora {ms_ahora:8.3f} ms  x{ms_antes / ms_ahora:.1f}")
+
+
+if __name__ == "__main__":
+    main()
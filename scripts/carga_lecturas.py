@@ -0,0 +1,77 @@
+"""
+Prueba de carga de las lecturas que las tablets consultan constantemente.
+
+Levantar el servidor en cada modo y correr el script contra él:
+
+    DB_ASYNC_LECTURAS=false uvicorn app.main:app --port 8000
+    python scripts/carga_lecturas.py --url http://localhost:8000 --clientes 300 --segundos 30
+
+    DB_ASYNC_LECTURAS=true uvicorn app.main:app --port 8000
+    python scripts/carga_lecturas.py --url http://localhost:8000 --clientes 300 --segundos 30
+
+Requiere httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+ENDPOINTS = ["/mesas/", "/turnos/activos", "/productos/"]
+
+
+async def cliente(http: httpx.AsyncClient, path: str, hasta: float, latencias: list, errores: list):
+    while time.perf_counter() < hasta:
+        inicio = time.perf_counter()
+        try:
+            r = await http.get(path)
+            if r.status_code != 200:
+                errores.append(r.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errores.append(type(e).__name__)
+            continue
+        latencias.append(time.perf_counter() - inicio)
+
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clientes", type=int, default=200, help="clientes concurrentes por endpoint")
+    parser.add_argument("--segundos", type=float, default=20)
+    args = parser.parse_args()
+
+    limites = httpx.Limits(max_connections=args.clientes * len(ENDPOINTS))
+    async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=30) as http:
+        resultados = {path: ([], []) for path in ENDPOINTS}
+        hasta = time.perf_counter() + args.segundos
+
+        await asyncio.gather(*(
+            cliente(http, path, hasta, *resultados[path])
+            for path in ENDPOINTS
+            for _ in range(args.clientes)
+        ))
+
+    print(f"{args.clientes} clientes por endpoint durante {args.segundos:.0f}s contra {args.url}")
+    print(f"{'endpoint':<18}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errores':>10}")
+    for path, (latencias, errores) in resultados.items():
+        print(
+            f"{path:<18}"
+            f"{len(latencias) / args.segundos:>10.1f}"
+            f"{(statistics.median(latencias) if latencias else 0) * 1000:>10.1f}"
+            f"{percentil(latencias, 0.95) * 1000:>10.1f}"
+            f"{percentil(latencias, 0.99) * 1000:>10.1f}"
+            f"{len(errores):>10}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+"""
+Login/registro: el hash corre sin tener una conexión del pool tomada.
+"""
+from uuid import uuid4
+
+import bcrypt
+
+from app.database import SessionLocal, engine
+from app.models.user import User
+from app.utils import security
+
+
+def _login(client, username: str, password: str):
+    return client.post("/auth/login", data={"username": username, "password": password})
+
+
+def test_registro_y_login(client):
+    username = f"cajero-{uuid4().hex[:8]}"
+
+    creado = client.post("/auth/register", json={"username": username, "password": "clave123"})
+    assert creado.status_code == 200
+    assert creado.json()["rol"] == "empleado"
+    assert client.post("/auth/register", json={"username": username, "password": "otra"}).status_code == 400
+
+    assert _login(client, username, "clave123").json()["access_token"]
+    assert _login(client, username, "mala").status_code == 401
+
+
+def test_login_no_retiene_conexion_mientras_verifica(client, monkeypatch):
+    username = f"cajero-{uuid4().hex[:8]}"
+    client.post("/auth/register", json={"username": username, "password": "clave123"})
+
+    tomadas = []
+    verificar = security._verificar
+
+    def _verificar_midiendo(password, hashed):
+        tomadas.append(engine.pool.checkedout())
+        return verificar(password, hashed)
+
+    monkeypatch.setattr(security, "_verificar", _verificar_midiendo)
+    assert _login(client, username, "clave123").status_code == 200
+    assert tomadas == [0]
+
+
+def test_login_rehashea_bcrypt(client):
+    username = f"viejo-{uuid4().hex[:8]}"
+    with SessionLocal() as db:
+        db.add(User(username=username, password_hash=bcrypt.hashpw(b"clave123", bcrypt.gensalt(4)).decode(), rol="empleado"))
+        db.commit()
+
+    assert _login(client, username, "clave123").status_code == 200
+
+    with SessionLocal() as db:
+        nuevo = db.query(User).filter(User.username == username).one().password_hash
+    assert nuevo.startswith("$argon2")
@@ -0,0 +1,88 @@
+"""
+Stock del catálogo en memoria contra cargas en frío y escrituras que llegan
+fuera de orden.
+"""
+import json
+
+from app.database import SessionLocal
+from app.models.producto import Producto
+from app.utils.catalogo import Catalogo
+from app.utils.stock import mover_stock
+
+
+def _stock(cat: Catalogo, producto_id: int) -> int:
+    return next(p["cantidad"] for p in json.loads(cat.productos_json()) if p["id"] == producto_id)
+
+
+def test_carga_en_frio_entre_commit_y_cache_no_duplica(db):
+    producto = Producto(nombre="Cerveza catálogo", precio_compra=1, precio_venta=3, cantidad=10)
+    db.add(producto)
+    db.commit()
+    cat = Catalogo()
+
+    movimiento = mover_stock(db, producto.id, -2)
+    db.commit()
+    with SessionLocal() as otra:
+        cat.cargar(otra)  # ya ve el stock nuevo
+    cat.fijar_stock(producto.id, movimiento.cantidad, movimiento.orden)
+
+    assert _stock(cat, producto.id) == 8
+
+
+def test_escritura_vieja_que_llega_tarde_no_pisa(db):
+    producto = Producto(nombre="Gaseosa catálogo", precio_compra=1, precio_venta=3, cantidad=10)
+    db.add(producto)
+    db.commit()
+    cat = Catalogo()
+    cat.cargar(db)
+
+    primera = (9, cat.orden_stock())
+    segunda = (8, cat.orden_stock())
+    cat.fijar_stock(producto.id, *segunda)
+    cat.fijar_stock(producto.id, *primera)
+
+    assert _stock(cat, producto.id) == 8
+
+
+def test_venta_vieja_no_pisa_la_cantidad_editada(db):
+    producto = Producto(nombre="Agua catálogo", precio_compra=1, precio_venta=3, cantidad=10)
+    db.add(producto)
+    db.commit()
+    cat = Catalogo()
+    cat.cargar(db)
+
+    venta = (9, cat.orden_stock())  # la venta tuvo la fila antes que la edición
+    producto.cantidad = 50
+    cat.guardar_producto(producto, cat.orden_stock())
+    cat.fijar_stock(producto.id, *venta)
+
+    assert _stock(cat, producto.id) == 50
+
+
+def test_edicion_vieja_no_pisa_el_stock_de_una_venta_nueva(db):
+    producto = Producto(nombre="Jugo catálogo", precio_compra=1, precio_venta=3, cantidad=10)
+    db.add(producto)
+    db.commit()
+    cat = Catalogo()
+    cat.cargar(db)
+
+    edicion = cat.orden_stock()
+    cat.fijar_stock(producto.id, 7, cat.orden_stock())
+    producto.nombre = "Jugo grande"
+    cat.guardar_producto(producto, edicion)
+
+    item = next(p for p in json.loads(cat.productos_json()) if p["id"] == producto.id)
+    assert (item["nombre"], item["cantidad"]) == ("Jugo grande", 7)
+
+
+def test_put_producto_actualiza_el_catalogo(client, db):
+    producto = Producto(nombre="Maní catálogo", precio_compra=1, precio_venta=3, cantidad=10)
+    db.add(producto)
+    db.commit()
+    client.get("/productos/")  # catálogo cargado
+
+    resp = client.put(f"/productos/{producto.id}", json={"cantidad": 40, "precio_venta": 4})
+    assert resp.status_code == 200
+
+    item = next(p for p in client.get("/productos/").json() if p["id"] == producto.id)
+    assert (item["cantidad"], item["precio_venta"]) == (40, 4)
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import pytest
+from hypothesis import given, strategies as st
+
+from app.models.mesa import Mesa
+from app.models.turno import Turno
+from app.routers.turnos import _now_bo
+from app.utils.facturacion import cobro_tiempo, liquidar_turnos
+
+
+def _regla_original(minutos: float, tarifa_hora: float) -> float:
+    # copia literal de preview / cerrar_turno antes del módulo de facturación
+    if minutos <= 30:
+        subtotal = tarifa_hora / 2
+    else:
+        horas_completas = int(minutos // 60)
+        resto = minutos % 60
+
+        subtotal = horas_completas * tarifa_hora
+        subtotal += tarifa_hora if resto >= 31 else tarifa_hora / 2
+    return subtotal
+
+
+AHORA = datetime(2025, 11, 20, 22, 0, 0)
+
+tarifas = st.floats(min_value=0, max_value=500, allow_nan=False, allow_infinity=False)
+segundos = st.integers(min_value=0, max_value=3 * 24 * 3600)
+
+
+@given(seg=segundos, tarifa=tarifas)
+def test_cobro_igual_a_regla_original(seg, tarifa):
+    minutos = seg / 60
+    assert cobro_tiempo(minutos, tarifa) == _regla_original(minutos, tarifa)
+
+
+@given(seg=segundos, extra=st.integers(min_value=0, max_value=3600), tarifa=tarifas)
+def test_mas_tiempo_nunca_cobra_menos(seg, extra, tarifa):
+    assert cobro_tiempo((seg + extra) / 60, tarifa) >= cobro_tiempo(seg / 60, tarifa)
+
+
+@pytest.mark.parametrize("minutos, esperado", [
+    (0, 10), (30, 10), (31, 20), (59, 20), (60, 30), (90, 30), (91, 40), (120, 50),
+])
+def test_casos_conocidos(minutos, esperado):
+    assert cobro_tiempo(minutos, 20) == esperado
+
+
+def test_liquidar_turnos_suma_productos_y_descuentos():
+    class T:
+        hora_inicio = AHORA - timedelta(minutes=75)
+        tarifa_hora = 20.0
+        pausa_acumulada_seg = 0
+        pausa_inicio = None
+        subtotal_productos = 15.0
+        servicios_extras = 5.0
+        descuento = 2.0
+
+    assert liquidar_turnos([T()], AHORA) == [(30.0, 48.0)]
+
+
+def test_activos_en_vivo_coincide_con_preview(client, db):
+    # lejos de los cortes de 30/31/60 min para que los ms entre requests no cambien el cobro
+    ahora = _now_bo()
+    casos = [
+        dict(hora_inicio=ahora - timedelta(minutes=10)),
+        dict(hora_inicio=ahora - timedelta(minutes=45), subtotal_productos=12.5, descuento=2),
+        dict(hora_inicio=ahora - timedelta(minutes=100), servicios_extras=5, pausa_acumulada_seg=900),
+        dict(hora_inicio=ahora - timedelta(minutes=200), estado="pausado", pausa_inicio=ahora - timedelta(minutes=45)),
+    ]
+    turnos = [
+        Turno(mesa=Mesa(nombre=f"Mesa en vivo {i}", tarifa_por_hora=25, estado="ocupada"),
+              tarifa_hora=25, **{"estado": "abierto", **caso})
+        for i, caso in enumerate(casos)
+    ]
+    db.add_all(turnos)
+    db.commit()
+    ids = {t.id for t in turnos}
+
+    en_vivo = {t["id"]: t for t in client.get("/turnos/activos", params={"en_vivo": True}).json() if t["id"] in ids}
+    assert en_vivo.keys() == ids
+    for turno_id, t in en_vivo.items():
+        preview = client.get(f"/turnos/{turno_id}/preview").json()
+        assert (t["subtotal_tiempo"], t["total_final"]) == (preview["subtotal_tiempo"], preview["total_final"])
+        assert t["subtotal_tiempo"] > 0
@@ -0,0 +1,55 @@
+"""
+GET /gastos: filtros de fecha y paginación.
+"""
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from app.config import settings
+from app.models.gasto import Gasto
+from app.models.user import User
+from app.utils.security import create_access_token
+
+
+@pytest.fixture
+def admin(db):
+    user = User(username=f"admin-{uuid4().hex[:8]}", password_hash="x", rol="admin")
+    db.add(user)
+    db.commit()
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+
+@pytest.mark.parametrize("params", [
+    {"desde": "abc"}, {"desde": "2025-13-01"}, {"hasta": "1/2"}, {"hasta": "31/02/2025"},
+])
+def test_fecha_invalida_da_400(client, admin, params):
+    resp = client.get("/gastos/", params=params, headers=admin)
+    assert resp.status_code == 400
+    assert "Fecha inválida" in resp.json()["detail"]
+
+
+def test_fechas_validas(client, admin):
+    resp = client.get("/gastos/", params={"desde": "2025-01-01", "hasta": "31/12/2025"}, headers=admin)
+    assert resp.status_code == 200
+
+
+def test_sin_limit_devuelve_una_pagina_acotada(client, db, admin):
+    dia = datetime(2018, 5, 5, 12, 0)
+    db.add_all([
+        Gasto(nombre=f"Tiza {i}", precio=1, cantidad=1, total=1, created_at=dia)
+        for i in range(settings.PAGINA_DEFAULT + 5)
+    ])
+    db.commit()
+    rango = {"desde": "2018-05-05", "hasta": "2018-05-05"}
+
+    primera = client.get("/gastos/", params=rango, headers=admin)
+    assert len(primera.json()) == settings.PAGINA_DEFAULT
+
+    segunda = client.get("/gastos/", params={**rango, "cursor": primera.headers["X-Next-Cursor"]}, headers=admin)
+    assert len(segunda.json()) == 5
+    assert "X-Next-Cursor" not in segunda.headers
+
+
+def test_limit_mayor_al_maximo_da_422(client, admin):
+    assert client.get("/gastos/", params={"limit": 501}, headers=admin).status_code == 422
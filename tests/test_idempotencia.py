@@ -0,0 +1,143 @@
+"""
+Idempotency-Key: un reintento devuelve la primera respuesta sin volver a ejecutar.
+"""
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.consumo import Consumo
+from app.models.mesa import Mesa
+from app.models.producto import Producto
+from app.models.turno import Turno
+from app.models.user import User
+from app.utils.security import create_access_token
+
+
+@pytest.fixture
+def venta(db):
+    producto = Producto(nombre="Cerveza idem", precio_compra=1, precio_venta=4, cantidad=5)
+    turno = Turno(mesa=Mesa(nombre="Mesa idem", tarifa_por_hora=20, estado="ocupada"), tarifa_hora=20, estado="abierto")
+    db.add_all([producto, turno])
+    db.commit()
+    return producto.id, turno.id
+
+
+def _auth(db, username: str) -> dict:
+    user = User(username=f"{username}-{uuid4().hex[:8]}", password_hash="x", rol="empleado")
+    db.add(user)
+    db.commit()
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+
+def _consumos(db, turno_id: int) -> int:
+    return db.scalar(select(func.count(Consumo.id)).where(Consumo.turno_id == turno_id))
+
+
+def test_reintento_devuelve_la_misma_respuesta_sin_reejecutar(client, db, venta):
+    producto_id, turno_id = venta
+    clave = {"Idempotency-Key": str(uuid4())}
+    body = {"producto_id": producto_id, "cantidad": 2}
+
+    primera = client.post(f"/turnos/{turno_id}/agregar-producto", json=body, headers=clave)
+    segunda = client.post(f"/turnos/{turno_id}/agregar-producto", json=body, headers=clave)
+
+    assert primera.status_code == segunda.status_code == 200
+    assert segunda.content == primera.content
+    assert segunda.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in primera.headers
+
+    db.expire_all()
+    assert _consumos(db, turno_id) == 1
+    assert db.get(Producto, producto_id).cantidad == 3
+
+
+def test_errores_4xx_tambien_se_repiten(client, db, venta):
+    producto_id, turno_id = venta
+    clave = {"Idempotency-Key": str(uuid4())}
+    body = {"producto_id": producto_id, "cantidad": 50}
+
+    primera = client.post(f"/turnos/{turno_id}/agregar-producto", json=body, headers=clave)
+    segunda = client.post(f"/turnos/{turno_id}/agregar-producto", json=body, headers=clave)
+
+    assert primera.status_code == segunda.status_code == 400
+    assert segunda.headers["Idempotent-Replayed"] == "true"
+
+
+def test_misma_clave_con_otro_body_da_422(client, venta):
+    producto_id, turno_id = venta
+    clave = {"Idempotency-Key": str(uuid4())}
+
+    client.post(f"/turnos/{turno_id}/agregar-producto", json={"producto_id": producto_id, "cantidad": 1}, headers=clave)
+    otra = client.post(f"/turnos/{turno_id}/agregar-producto", json={"producto_id": producto_id, "cantidad": 2}, headers=clave)
+
+    assert otra.status_code == 422
+
+
+def test_sin_header_no_cambia_nada(client, db, venta):
+    producto_id, turno_id = venta
+    body = {"turno_id": turno_id, "producto_id": producto_id, "cantidad": 1}
+
+    assert client.post("/consumos/", json=body).status_code == 200
+    assert client.post("/consumos/", json=body).status_code == 200
+
+    db.expire_all()
+    assert _consumos(db, turno_id) == 2
+
+
+def test_token_invalido_no_consume_la_clave(client, db):
+    mesa = Mesa(nombre="Mesa idem auth", tarifa_por_hora=20, estado="libre")
+    db.add(mesa)
+    db.commit()
+    clave = str(uuid4())
+    body = {"mesa_id": mesa.id, "tarifa_hora": 20}
+
+    mala = client.post("/turnos/iniciar", json=body, headers={"Idempotency-Key": clave, "Authorization": "Bearer basura"})
+    assert mala.status_code == 401
+
+    buena = client.post("/turnos/iniciar", json=body, headers={"Idempotency-Key": clave, **_auth(db, "tablet")})
+    assert buena.status_code == 200
+    assert "Idempotent-Replayed" not in buena.headers
+
+
+def test_body_invalido_no_consume_la_clave(client, venta):
+    producto_id, turno_id = venta
+    clave = {"Idempotency-Key": str(uuid4())}
+
+    mala = client.post(f"/turnos/{turno_id}/agregar-producto", json={"producto_id": producto_id}, headers=clave)
+    buena = client.post(f"/turnos/{turno_id}/agregar-producto", json={"producto_id": producto_id, "cantidad": 1}, headers=clave)
+
+    assert mala.status_code == 422
+    assert buena.status_code == 200
+    assert "Idempotent-Replayed" not in buena.headers
+
+
+def test_claves_separadas_por_usuario(client, db, venta):
+    producto_id, turno_id = venta
+    clave = str(uuid4())
+    body = {"producto_id": producto_id, "cantidad": 1}
+
+    a = client.post(f"/turnos/{turno_id}/agregar-producto", json=body, headers={"Idempotency-Key": clave, **_auth(db, "a")})
+    b = client.post(f"/turnos/{turno_id}/agregar-producto", json=body, headers={"Idempotency-Key": clave, **_auth(db, "b")})
+
+    assert a.status_code == b.status_code == 200
+    assert "Idempotent-Replayed" not in b.headers
+    db.expire_all()
+    assert _consumos(db, turno_id) == 2
+
+
+def test_cerrar_con_if_match_viejo_no_consume_la_clave(client, db, venta):
+    _, turno_id = venta
+    auth = _auth(db, "cajero")
+    clave = str(uuid4())
+    version = db.get(Turno, turno_id).version
+
+    vieja = client.patch(f"/turnos/{turno_id}/cerrar", json={},
+                         headers={"Idempotency-Key": clave, "If-Match": f'"{version - 1}"', **auth})
+    assert vieja.status_code == 412
+
+    buena = client.patch(f"/turnos/{turno_id}/cerrar", json={},
+                         headers={"Idempotency-Key": clave, "If-Match": vieja.headers["ETag"], **auth})
+    assert buena.status_code == 200
+    assert "Idempotent-Replayed" not in buena.headers
+    assert buena.json()["estado"] == "cerrado"
@@ -0,0 +1,32 @@
+from app.utils.metricas import Histograma, _etiquetas
+
+
+def test_histograma_acumula_buckets():
+    h = Histograma("x_seconds", "ayuda", ("route",), (0.1, 1.0))
+    h.observar(0.05, "/a")
+    h.observar(0.5, "/a")
+
+    texto = "\n".join(h.exponer())
+    assert 'x_seconds_bucket{route="/a",le="0.1"} 1' in texto
+    assert 'x_seconds_bucket{route="/a",le="1.0"} 2' in texto
+    assert 'x_seconds_bucket{route="/a",le="+Inf"} 2' in texto
+    assert 'x_seconds_count{route="/a"} 2' in texto
+
+
+def test_etiquetas_escapadas():
+    assert _etiquetas(('a"b\\c',), ("route",)) == '{route="a\\"b\\\\c"}'
+
+
+def test_metrics_cuenta_requests_y_sql_por_ruta(client):
+    client.get("/mesas/")
+    client.get("/mesas/")
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+
+    texto = resp.text
+    assert 'http_requests_total{method="GET",route="/mesas/",status="200"}' in texto
+    assert 'http_request_db_queries_count{method="GET",route="/mesas/"}' in texto
+    assert "db_statements_total" in texto
+    assert 'db_pool_checked_out{engine="sync"}' in texto
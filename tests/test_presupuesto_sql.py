@@ -0,0 +1,128 @@
+"""
+Presupuesto de consultas SQL por endpoint: la cantidad de sentencias no puede
+crecer con las filas (un N+1 en mesa_to_dict, turno_to_dict o el reporte
+rompe estos tests). Cada endpoint se mide con pocas y con muchas filas.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app.database import SessionLocal
+from app.models.consumo import Consumo
+from app.models.mesa import Mesa
+from app.models.producto import Producto
+from app.models.turno import Turno
+from app.models.user import User
+from app.utils.catalogo import catalogo
+
+# (turnos, líneas de consumo por turno); 50x20 es una noche llena
+FILAS = ((2, 2), (25, 2), (50, 20))
+
+# sentencias máximas por request (incluye el SET LOCAL de statement_timeout
+# en las sesiones de reportes)
+PRESUPUESTO = {
+    "/mesas/": 1,
+    "/turnos/activos": 3,
+    "/reportes/": 3,
+    "/reportes/export": 2,
+    "/productos/": 2,  # catálogo frío: productos + categorías
+}
+
+
+def _dia(n: int) -> datetime:
+    # un día propio por tamaño: los reportes solo ven lo sembrado por su caso
+    return datetime(2020, 1, 1) + timedelta(days=n)
+
+
+def _sembrar(db, n: int, lineas: int) -> str:
+    """
+    n mesas ocupadas con turno abierto y n turnos cerrados el día _dia(n),
+    cada turno con `lineas` consumos, atendido y cobrado por usuarios distintos.
+    """
+    dia = _dia(n)
+    atiende = User(username=f"atiende-{n}", password_hash="x", rol="empleado")
+    cobra = User(username=f"cobra-{n}", password_hash="x", rol="admin")
+    productos = [
+        Producto(nombre=f"Producto {n}-{i}", precio_compra=1, precio_venta=3, cantidad=100)
+        for i in range(lineas)
+    ]
+    db.add_all([atiende, cobra, *productos])
+    db.flush()
+
+    for i in range(n):
+        mesa = Mesa(nombre=f"Mesa {n}-{i}", tarifa_por_hora=20, estado="ocupada", hora_inicio=dia)
+        abierto = Turno(mesa=mesa, tarifa_hora=20, estado="abierto", hora_inicio=dia,
+                        atendido_por_id=atiende.id)
+        cerrado = Turno(mesa=mesa, tarifa_hora=20, estado="cerrado",
+                        hora_inicio=dia, hora_fin=dia + timedelta(hours=1),
+                        subtotal_tiempo=20, subtotal_productos=3 * lineas, total_final=20 + 3 * lineas,
+                        atendido_por_id=atiende.id, cobrado_por_id=cobra.id)
+        for turno in (abierto, cerrado):
+            turno.consumos = [
+                Consumo(producto_id=p.id, cantidad=1, subtotal=3) for p in productos
+            ]
+        db.add_all([mesa, abierto, cerrado])
+    db.commit()
+    return dia.date().isoformat()
+
+
+@pytest.fixture(scope="module", params=FILAS, ids=lambda f: f"{f[0]}x{f[1]}")
+def sembrado(request, db_engine):
+    n, lineas = request.param
+    with SessionLocal() as db:
+        return n, lineas, _sembrar(db, n, lineas)
+
+
+def _medir(client, contar_consultas, url: str, ruta: str, calentar: bool = True, **params):
+    if calentar:
+        client.get(url, params=params)  # calienta conexiones y caches de proceso
+    with contar_consultas(PRESUPUESTO[ruta]) as consultas:
+        resp = client.get(url, params=params)
+    assert resp.status_code == 200, resp.text
+    return resp, consultas
+
+
+def test_listar_mesas(client, contar_consultas, sembrado):
+    n, _, _ = sembrado
+    resp, _ = _medir(client, contar_consultas, "/mesas/", "/mesas/")
+    assert len(resp.json()) >= n
+
+
+def test_turnos_activos(client, contar_consultas, sembrado):
+    n, lineas, dia = sembrado
+    resp, _ = _medir(client, contar_consultas, "/turnos/activos", "/turnos/activos")
+    sembrados = [t for t in resp.json() if t["hora_inicio"].startswith(dia)]
+    assert len(sembrados) == n
+    assert all(len(t["consumos"]) == lineas for t in sembrados)
+
+
+def test_reporte_turnos(client, contar_consultas, sembrado):
+    n, lineas, dia = sembrado
+    resp, _ = _medir(client, contar_consultas, "/reportes/", "/reportes/",
+                     fecha_inicio=dia, fecha_fin=dia)
+    data = resp.json()
+    assert len(data["turnos"]) == n
+    assert all(len(t["consumos"]) == lineas for t in data["turnos"])
+    assert all(t["atendido_por"] and t["facturado_por"] for t in data["turnos"])
+
+
+def test_reporte_export(client, contar_consultas, sembrado):
+    n, lineas, dia = sembrado
+    resp, _ = _medir(client, contar_consultas, "/reportes/export", "/reportes/export",
+                     fecha_inicio=dia, fecha_fin=dia)
+    assert len(resp.text.strip().splitlines()) >= n
+
+
+def test_catalogo_productos_en_frio(client, contar_consultas, sembrado):
+    client.get("/productos/")
+    catalogo.invalidar()
+    resp, _ = _medir(client, contar_consultas, "/productos/", "/productos/", calentar=False)
+    assert len(resp.json()) >= 2
+
+
+def test_presupuesto_excedido_falla(contar_consultas, db):
+    with pytest.raises(pytest.fail.Exception, match="2 consultas SQL, presupuesto 1"):
+        with contar_consultas(1):
+            db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 2"))
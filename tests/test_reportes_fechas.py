@@ -0,0 +1,43 @@
+"""
+Todos los reportes usan la misma regla de fecha: un turno cuenta en el día de
+su hora_fin, también cuando cruza la medianoche.
+"""
+import json
+from datetime import datetime
+
+import pytest
+
+from app.models.mesa import Mesa
+from app.models.turno import Turno
+from app.utils.resumen_diario import registrar_turno_cerrado
+
+
+@pytest.fixture
+def turno_medianoche(db):
+    mesa = Mesa(nombre="Mesa medianoche", tarifa_por_hora=20, estado="libre")
+    turno = Turno(
+        mesa=mesa, tarifa_hora=20, estado="cerrado",
+        hora_inicio=datetime(2019, 3, 1, 23, 30), hora_fin=datetime(2019, 3, 2, 0, 30),
+        subtotal_tiempo=20, subtotal_productos=0, descuento=0, servicios_extras=0, total_final=20,
+    )
+    db.add(turno)
+    db.flush()
+    registrar_turno_cerrado(db, turno)
+    db.commit()
+    return mesa.id
+
+
+def _totales(client, dia: str, mesa_id: int) -> dict:
+    rango = {"fecha_inicio": dia, "fecha_fin": dia, "mesa_id": mesa_id}
+    totales = {"reporte": client.get("/reportes/", params=rango).json()["total_general"]}
+    for agrupar in ("hora", "dia", "mesa"):
+        resp = client.get("/reportes/resumen", params={**rango, "agrupar": agrupar})
+        totales[agrupar] = resp.json()["actual"]["total"]["total_general"]
+    ultima = client.get("/reportes/export", params=rango).text.splitlines()[-1]
+    totales["export"] = json.loads(ultima)["total_general"]
+    return totales
+
+
+def test_turno_que_cruza_medianoche_cuenta_en_el_dia_de_cierre(client, turno_medianoche):
+    assert set(_totales(client, "2019-03-02", turno_medianoche).values()) == {20.0}
+    assert set(_totales(client, "2019-03-01", turno_medianoche).values()) == {0.0}
@@ -0,0 +1,95 @@
+"""
+Ventas simultáneas contra la base real: el stock nunca queda negativo ni se
+pierden descuentos, y subtotal_productos coincide con los consumos insertados.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from app.database import SessionLocal
+from app.models.consumo import Consumo
+from app.models.mesa import Mesa
+from app.models.producto import Producto
+from app.models.turno import Turno
+from app.routers.consumos import registrar_consumo
+from app.routers.productos import ajustar_stock
+from app.routers.turnos import agregar_producto, agregar_productos_lote
+from app.schemas.consumo_schema import ConsumoCreate
+from app.schemas.producto_schema import ProductoStockDelta
+from app.schemas.turno_schema import AgregarProducto, AgregarProductosLote
+
+HILOS = 16
+VENTAS = 300
+STOCK = 60
+PRECIO = 2.5
+
+
+def _preparar(db, stock: int) -> tuple[list[int], list[int]]:
+    productos = [
+        Producto(nombre=f"Cerveza {i}", precio_compra=1, precio_venta=PRECIO, cantidad=stock)
+        for i in range(2)
+    ]
+    turnos = []
+    for i in range(2):
+        mesa = Mesa(nombre=f"Mesa stress {i}", tarifa_por_hora=20, estado="ocupada")
+        turnos.append(Turno(mesa=mesa, tarifa_hora=20, estado="abierto"))
+    db.add_all(productos + turnos)
+    db.commit()
+    return [p.id for p in productos], [t.id for t in turnos]
+
+
+def _llamar(fn, *args) -> int:
+    with SessionLocal() as s:
+        try:
+            fn(*args, db=s)
+            return 200
+        except HTTPException as exc:
+            return exc.status_code
+
+
+def test_ventas_simultaneas_no_sobrevenden(db):
+    productos, turnos = _preparar(db, STOCK)
+    p1, p2 = productos
+
+    def vender(i: int) -> list[int]:
+        turno_id = turnos[i % 2]
+        tipo = i % 3
+        if tipo == 0:
+            return [_llamar(agregar_producto, turno_id, AgregarProducto(producto_id=p1, cantidad=1))]
+        if tipo == 1:
+            return [_llamar(registrar_consumo, ConsumoCreate(turno_id=turno_id, producto_id=p2, cantidad=1))]
+        # ronda con los dos productos en orden inverso: no debe trabarse con las otras ventas
+        return [_llamar(agregar_productos_lote, turno_id, AgregarProductosLote(consumos=[
+            {"producto_id": p2, "cantidad": 1}, {"producto_id": p1, "cantidad": 1},
+        ]))]
+
+    with ThreadPoolExecutor(max_workers=HILOS) as pool:
+        resultados = [r for lote in pool.map(vender, range(VENTAS)) for r in lote]
+
+    assert set(resultados) <= {200, 400}
+
+    db.expire_all()
+    for pid in productos:
+        vendidos = db.scalar(select(func.coalesce(func.sum(Consumo.cantidad), 0)).where(Consumo.producto_id == pid))
+        assert vendidos == STOCK
+        assert db.get(Producto, pid).cantidad == 0
+
+    for tid in turnos:
+        turno = db.get(Turno, tid)
+        cantidad = db.scalar(select(func.coalesce(func.sum(Consumo.cantidad), 0)).where(Consumo.turno_id == tid))
+        assert turno.subtotal_productos == cantidad * PRECIO
+
+
+def test_ajustes_de_stock_simultaneos_no_pierden_deltas(db):
+    (pid, _), _ = _preparar(db, 50)
+
+    deltas = [1, -1] * 200
+    with ThreadPoolExecutor(max_workers=HILOS) as pool:
+        resultados = list(pool.map(lambda d: _llamar(ajustar_stock, pid, ProductoStockDelta(delta=d)), deltas))
+
+    restas_ok = sum(1 for d, r in zip(deltas, resultados) if d < 0 and r == 200)
+    assert all(r == 200 for d, r in zip(deltas, resultados) if d > 0)
+
+    db.expire_all()
+    assert db.get(Producto, pid).cantidad == 50 + 200 - restas_ok
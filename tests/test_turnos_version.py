@@ -0,0 +1,110 @@
+"""
+Concurrencia optimista de turnos: version, If-Match (412) y conflicto al commit (409).
+"""
+import json
+
+import pytest
+from starlette.requests import Request
+
+from app.database import SessionLocal
+from app.deps import UsuarioActual
+from app.models.mesa import Mesa
+from app.models.producto import Producto
+from app.models.turno import Turno
+from app.routers import turnos
+from app.routers.turnos import agregar_producto, cerrar_turno, pausar_turno, reanudar_turno
+from app.schemas.turno_schema import AgregarProducto, CerrarTurno
+
+CAJERO = UsuarioActual(id=None, username="cajero", rol="admin")
+
+
+def _request(if_match: str | None = None) -> Request:
+    headers = [(b"if-match", if_match.encode())] if if_match else []
+    return Request({"type": "http", "method": "PATCH", "headers": headers})
+
+
+@pytest.fixture
+def turno_id(db):
+    mesa = Mesa(nombre="Mesa version", tarifa_por_hora=20, estado="ocupada")
+    turno = Turno(mesa=mesa, tarifa_hora=20, estado="abierto")
+    db.add(turno)
+    db.commit()
+    return turno.id
+
+
+def _body(resp) -> dict:
+    return json.loads(resp.body)
+
+
+def test_cada_cambio_sube_la_version(db, turno_id):
+    with SessionLocal() as s:
+        resp = pausar_turno(turno_id, _request('"1"'), db=s)
+    assert resp.status_code == 200
+    assert _body(resp)["version"] == 2
+    assert resp.headers["ETag"] == '"2"'
+
+    with SessionLocal() as s:
+        resp = reanudar_turno(turno_id, _request('W/"2"'), db=s)
+    assert _body(resp)["version"] == 3
+
+
+def test_if_match_viejo_devuelve_412_con_estado_actual(db, turno_id):
+    with SessionLocal() as s:
+        pausar_turno(turno_id, _request(), db=s)
+
+    with SessionLocal() as s:
+        resp = reanudar_turno(turno_id, _request('"1"'), db=s)
+
+    assert resp.status_code == 412
+    actual = _body(resp)["turno"]
+    assert actual["estado"] == "pausado"
+    assert actual["version"] == 2
+
+    db.expire_all()
+    assert db.get(Turno, turno_id).estado == "pausado"
+
+
+def test_cerrar_con_version_de_antes_del_consumo_da_412(db, turno_id):
+    producto = Producto(nombre="Cerveza version", precio_compra=1, precio_venta=3, cantidad=10)
+    db.add(producto)
+    db.commit()
+
+    # tablet A leyó el turno (versión 1); mientras tanto tablet B agrega un consumo
+    with SessionLocal() as s:
+        agregar_producto(turno_id, AgregarProducto(producto_id=producto.id, cantidad=2), db=s)
+
+    with SessionLocal() as s:
+        resp = cerrar_turno(turno_id, CerrarTurno(), _request('"1"'), db=s, current_user=CAJERO)
+    assert resp.status_code == 412
+    assert _body(resp)["turno"]["subtotal_productos"] == 6
+
+    # con la versión actual el cierre incluye el consumo
+    with SessionLocal() as s:
+        resp = cerrar_turno(turno_id, CerrarTurno(), _request('"2"'), db=s, current_user=CAJERO)
+    assert resp.status_code == 200
+    assert _body(resp)["estado"] == "cerrado"
+    assert _body(resp)["total_final"] == _body(resp)["subtotal_tiempo"] + 6
+
+
+def test_consumo_durante_el_cierre_da_409(db, turno_id, monkeypatch):
+    producto = Producto(nombre="Cerveza carrera", precio_compra=1, precio_venta=3, cantidad=10)
+    db.add(producto)
+    db.commit()
+
+    # sin If-Match: una venta entra justo entre la lectura del turno y el commit del cierre
+    registrar_original = turnos.registrar_turno_cerrado
+
+    def venta_en_medio(s, turno):
+        with SessionLocal() as otra:
+            agregar_producto(turno_id, AgregarProducto(producto_id=producto.id, cantidad=1), db=otra)
+        registrar_original(s, turno)
+
+    monkeypatch.setattr(turnos, "registrar_turno_cerrado", venta_en_medio)
+
+    with SessionLocal() as s:
+        resp = cerrar_turno(turno_id, CerrarTurno(), _request(), db=s, current_user=CAJERO)
+
+    assert resp.status_code == 409
+    actual = _body(resp)["turno"]
+    assert actual["estado"] == "abierto"
+    assert actual["subtotal_productos"] == 3
@@ -0,0 +1,61 @@
+"""
+Variantes de imágenes: cada original se encola una vez, y uno roto no se
+reintenta en cada request de su miniatura.
+"""
+import pytest
+from PIL import Image
+
+from app.utils import uploads
+
+
+class _ExecutorAnotador:
+    def __init__(self):
+        self.tareas = []
+
+    def submit(self, fn, *args):
+        self.tareas.append((fn, args))
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    falso = _ExecutorAnotador()
+    monkeypatch.setattr(uploads, "_variantes_executor", falso)
+    monkeypatch.setattr(uploads, "_variantes_en_curso", set())
+    monkeypatch.setattr(uploads, "_variantes_fallidas", {})
+    return falso
+
+
+def _correr(executor):
+    tareas, executor.tareas = executor.tareas, []
+    for fn, args in tareas:
+        fn(*args)
+
+
+def test_original_en_curso_se_encola_una_vez(tmp_path, executor):
+    original = tmp_path / ("a" * 64 + ".png")
+    Image.new("RGB", (600, 400), "green").save(original)
+
+    for _ in range(5):
+        uploads.programar_variantes(original)
+    assert len(executor.tareas) == 1
+
+    _correr(executor)
+    assert uploads.ruta_variante(original, "thumb").exists()
+    uploads.programar_variantes(original)
+    assert executor.tareas == []
+
+
+def test_original_roto_se_reintenta_despues_del_intervalo(tmp_path, executor):
+    original = tmp_path / ("b" * 64 + ".jpg")
+    original.write_bytes(b"esto no es una imagen")
+
+    uploads.programar_variantes(original)
+    _correr(executor)
+    for _ in range(5):
+        uploads.programar_variantes(original)
+    assert executor.tareas == []
+
+    # pasó el intervalo desde el fallo
+    uploads._variantes_fallidas[original] -= uploads.REINTENTO_FALLIDAS_SEG + 1
+    uploads.programar_variantes(original)
+    assert len(executor.tareas) == 1